@@ -0,0 +1,151 @@
+"""Analitik turunan lintas semua kota, dihitung tervektorisasi dalam satu lintasan
+
+Data polusi, kualitas hidup dan populasi kota digabung menjadi satu panel
+(satu baris per kota per tahun), lalu dihitung perubahan tahunan, peringkat
+persentil per tahun, rata-rata tertimbang populasi per negara/benua,
+paparan polusi per kapita dan korelasi polusi vs kualitas hidup.
+Hasil di-cache per versi data sehingga dashboard tidak menghitung ulang
+di setiap rerun.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import DatabaseConfig
+
+POLUSI_INDICATORS = DatabaseConfig.FACT_TABLES['polusi']['columns'][3:]
+KUALITAS_INDICATORS = DatabaseConfig.FACT_TABLES['kualitas']['columns'][3:]
+INDICATORS = POLUSI_INDICATORS + KUALITAS_INDICATORS
+SOURCE_TABLES = ('negara', 'kota', 'polusi', 'kualitas_hidup', 'populasi_kota')
+
+# Ambang PM2.5 untuk menghitung populasi terpapar (target interim 1 WHO, tahunan)
+PM25_THRESHOLD = 35.0
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def load_panel():
+    """Panel kota x tahun berisi semua indikator, populasi dan dimensi negara/benua"""
+    dims = ['nama_kota', 'kode_negara', 'benua']
+    keys = ['id_kota', 'tahun']
+    polusi = DatabaseConfig.get_polusi_data(columns=keys + POLUSI_INDICATORS + dims)
+    kualitas = DatabaseConfig.get_kualitas_hidup_data(columns=keys + KUALITAS_INDICATORS + dims)
+    populasi = DatabaseConfig.get_populasi_kota(columns=keys + ['jumlah_populasi'])
+    if polusi.empty or kualitas.empty or populasi.empty:
+        # Query gagal menghasilkan DataFrame tanpa kolom: panel kosong dengan kolom lengkap
+        return empty_panel()
+
+    panel = polusi.merge(kualitas, on=keys + dims, how='outer')
+    panel = panel.merge(populasi, on=keys, how='left')
+    for col in dims:
+        panel[col] = panel[col].astype('category')
+    return panel.sort_values(keys, ignore_index=True)
+
+
+def empty_panel():
+    """Panel tanpa baris dengan kolom dan tipe yang sama seperti load_panel"""
+    columns = {'id_kota': 'int64', 'tahun': 'int64'}
+    columns.update((col, 'float64') for col in INDICATORS)
+    columns.update((col, 'category') for col in ['nama_kota', 'kode_negara', 'benua'])
+    columns['jumlah_populasi'] = 'float64'
+    return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in columns.items()})
+
+
+def yoy_deltas(panel, indicators=INDICATORS):
+    """Perubahan absolut dan persen dari tahun sebelumnya (hanya jika tahunnya berurutan)"""
+    values = panel[indicators].astype('float64')
+    previous = values.groupby(panel['id_kota']).shift(1)
+    previous.loc[~panel['tahun'].groupby(panel['id_kota']).diff().eq(1)] = np.nan
+    delta = values - previous
+    pct = delta / previous.where(previous != 0) * 100
+    return pd.concat([delta.add_prefix('delta_'), pct.add_prefix('pct_')], axis=1)
+
+
+def percentile_ranks(panel, indicators=INDICATORS):
+    """Peringkat persentil (0-100) setiap kota dalam tahun yang sama"""
+    ranks = panel[indicators].groupby(panel['tahun']).rank(pct=True) * 100
+    return ranks.add_prefix('persentil_')
+
+
+def weighted_averages(panel, level, indicators=INDICATORS):
+    """Rata-rata indikator tertimbang populasi per (level, tahun); level = 'kode_negara' atau 'benua'"""
+    weights = panel['jumlah_populasi'].astype('float64')
+    values = panel[indicators].astype('float64')
+    # Bobot hanya dihitung untuk kota yang memiliki nilai indikator tersebut
+    present = values.notna()
+    weighted = values.fillna(0).mul(weights, axis=0)
+    weight_sum = present.mul(weights, axis=0)
+    groups = [panel[level], panel['tahun']]
+    numerator = weighted.groupby(groups, observed=True).sum()
+    denominator = weight_sum.groupby(groups, observed=True).sum()
+    result = (numerator / denominator.where(denominator > 0)).add_prefix('rata_tertimbang_')
+    result['jumlah_populasi'] = weights.groupby(groups, observed=True).sum()
+    result['jumlah_kota'] = panel['id_kota'].groupby(groups, observed=True).size()
+    return result.reset_index()
+
+
+def exposure(panel, level, indicator='pm25', threshold=PM25_THRESHOLD):
+    """Paparan per kapita dan populasi di kota dengan nilai indikator di atas ambang per (level, tahun)"""
+    weights = panel['jumlah_populasi'].astype('float64')
+    values = panel[indicator].astype('float64')
+    valid = values.notna() & weights.notna()
+    frame = pd.DataFrame({
+        'paparan_total': (values * weights).where(valid),
+        'populasi': weights.where(valid),
+        'populasi_di_atas_ambang': weights.where(valid & (values > threshold), 0)
+    })
+    result = frame.groupby([panel[level], panel['tahun']], observed=True).sum(min_count=1)
+    result['paparan_per_kapita'] = result['paparan_total'] / result['populasi'].where(result['populasi'] > 0)
+    result['persen_di_atas_ambang'] = result['populasi_di_atas_ambang'] / result['populasi'] * 100
+    return result.reset_index()
+
+
+def correlations(panel, method='pearson'):
+    """Korelasi setiap indikator polusi terhadap setiap indikator kualitas hidup (semua kota-tahun)"""
+    matrix = panel[INDICATORS].astype('float64').corr(method=method)
+    return matrix.loc[POLUSI_INDICATORS, KUALITAS_INDICATORS]
+
+
+def correlation_by_year(panel, x='index_kualitas_udara', y='index_kualitas_hidup'):
+    """Korelasi Pearson dua indikator per tahun"""
+    data = panel[['tahun', x, y]].dropna().astype({x: 'float64', y: 'float64'})
+    grouped = data.groupby('tahun')
+    # cov / (std_x * std_y) per tahun tanpa loop Python
+    mean_x, mean_y = grouped[x].transform('mean'), grouped[y].transform('mean')
+    cov = ((data[x] - mean_x) * (data[y] - mean_y)).groupby(data['tahun']).mean()
+    std = grouped[x].std(ddof=0) * grouped[y].std(ddof=0)
+    return pd.DataFrame({'korelasi': cov / std.where(std > 0), 'jumlah_kota': grouped.size()}).reset_index()
+
+
+def compute(panel):
+    """Semua hasil analitik dari satu panel"""
+    city = pd.concat([panel, yoy_deltas(panel), percentile_ranks(panel)], axis=1)
+    city['paparan_pm25'] = panel['pm25'].astype('float64') * panel['jumlah_populasi']
+    return {
+        'kota': city,
+        'negara': weighted_averages(panel, 'kode_negara'),
+        'benua': weighted_averages(panel, 'benua'),
+        'paparan_negara': exposure(panel, 'kode_negara'),
+        'paparan_benua': exposure(panel, 'benua'),
+        'korelasi': correlations(panel),
+        'korelasi_tahunan': correlation_by_year(panel)
+    }
+
+
+def get_analytics():
+    """Hasil analitik untuk versi data saat ini, dihitung sekali per versi dan dipakai bersama"""
+    version = DatabaseConfig.get_data_version(*SOURCE_TABLES)
+    with _cache_lock:
+        if version in _cache:
+            return _cache[version]
+        panel = load_panel()
+        result = compute(panel)
+        if panel.empty:
+            # Data sumber gagal dimuat: hasil kosong tidak disimpan agar dicoba lagi
+            return result
+        # Hanya versi terbaru yang disimpan
+        _cache.clear()
+        _cache[version] = result
+        return result
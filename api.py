@@ -0,0 +1,275 @@
+"""API HTTP ringan (tanpa UI) untuk dataset yang sama dengan dashboard
+
+Response berupa JSON (default) atau Arrow IPC stream (?format=arrow atau
+Accept: application/vnd.apache.arrow.stream), di-gzip jika klien mendukung.
+ETag diturunkan dari versi data sehingga klien yang mengirim If-None-Match
+mendapat 304 tanpa query ke database.
+
+Endpoint:
+    GET /version
+    GET /summary
+    GET /latest/<polusi|kualitas|populasi>?kode_negara=&benua=&columns=a,b
+    GET /series/<polusi|kualitas|populasi>?id_kota=&kode_negara=&benua=&tahun=2020|2018-2022|latest&columns=a,b
+    GET /compare?kota=1,2,3
+    GET /export/<polusi|kualitas|populasi>?kode_negara=&id_kota=&columns=a,b   # CSV, di-stream per chunk
+
+Penggunaan:
+    python api.py [--host 127.0.0.1] [--port 8502]
+"""
+import argparse
+import csv
+import gzip
+import hashlib
+import io
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from mysql.connector import Error
+
+import diagnostics
+from config import DatabaseConfig
+
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+# Response lebih kecil dari ini tidak di-gzip
+GZIP_MIN_BYTES = 1024
+# Baris per chunk export CSV (satu fetchmany dari cursor, satu chunk HTTP)
+EXPORT_CHUNK_ROWS = 5000
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def _tahun(value):
+    """'2020' -> 2020, '2018-2022' -> (2018, 2022), 'latest' tetap"""
+    if value == 'latest':
+        return value
+    if '-' in value:
+        start, end = value.split('-', 1)
+        return (int(start), int(end))
+    return int(value)
+
+
+def _filters(query):
+    """Argumen filter DatabaseConfig dari query string"""
+    filters = {}
+    if 'id_kota' in query:
+        filters['id_kota'] = int(query['id_kota'])
+    if 'kota' in query:
+        filters['kota_ids'] = _int_list(query['kota'])
+    if 'kode_negara' in query:
+        filters['kode_negara'] = query['kode_negara']
+    if 'benua' in query:
+        filters['benua'] = query['benua']
+    if 'tahun' in query:
+        filters['tahun'] = _tahun(query['tahun'])
+    if 'columns' in query:
+        filters['columns'] = [c for c in query['columns'].split(',') if c]
+    return filters
+
+
+def _fact_type(data_type):
+    if data_type not in DatabaseConfig.FACT_TABLES:
+        raise ValueError(f"Tipe data tidak dikenal: {data_type}")
+    return data_type
+
+
+def _series(data_type, query):
+    getter = {
+        'polusi': DatabaseConfig.get_polusi_data,
+        'kualitas': DatabaseConfig.get_kualitas_hidup_data,
+        'populasi': DatabaseConfig.get_populasi_kota
+    }[_fact_type(data_type)]
+    return getter(**_filters(query))
+
+
+def _latest(data_type, query):
+    filters = _filters(query)
+    filters.pop('id_kota', None)
+    filters.pop('tahun', None)
+    return DatabaseConfig.get_latest_snapshot(_fact_type(data_type), **filters)
+
+
+def _compare(query):
+    kota_ids = _int_list(query.get('kota', ''))
+    if len(kota_ids) < 2:
+        raise ValueError("Parameter kota membutuhkan minimal dua id_kota, mis. ?kota=1,2")
+    return DatabaseConfig.get_comparison_data(kota_ids)
+
+
+# path pertama -> fungsi(argumen path, query string) yang mengembalikan DataFrame
+ROUTES = {
+    'summary': lambda args, query: DatabaseConfig.get_summary_stats(),
+    'latest': lambda args, query: _latest(args[0] if args else 'polusi', query),
+    'series': lambda args, query: _series(args[0] if args else 'polusi', query),
+    'compare': lambda args, query: _compare(query),
+}
+
+
+def to_json(df):
+    return df.to_json(orient='records', date_format='iso').encode('utf-8')
+
+
+def to_arrow(df):
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("Format arrow membutuhkan paket 'pyarrow' (pip install pyarrow)") from e
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Handler GET untuk ROUTES, dengan ETag, 304 dan gzip"""
+    server_version = 'PolusiAPI/1.0'
+    # HTTP/1.1 untuk Transfer-Encoding: chunked pada /export
+    protocol_version = 'HTTP/1.1'
+
+    def _format(self, query):
+        if query.get('format') in ('arrow', 'json'):
+            return query['format']
+        return 'arrow' if ARROW_MIME in self.headers.get('Accept', '') else 'json'
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        if body and len(body) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=5)
+            headers = dict(headers or {}, **{'Content-Encoding': 'gzip'})
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept, Accept-Encoding')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({'error': message}).encode('utf-8'))
+
+    def _unavailable(self, error):
+        """503 tanpa ETag, sehingga klien tidak menyimpan hasil gagal sebagai versi data saat ini"""
+        self._send(503, json.dumps({'error': f"Database tidak tersedia: {error}"}).encode('utf-8'),
+                   headers={'Retry-After': '5', 'Cache-Control': 'no-store'})
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+
+    def _export(self, args, query):
+        """CSV data fakta yang di-stream dari cursor per chunk, tanpa memuat semua baris ke memori"""
+        data_type = _fact_type(args[0] if args else 'polusi')
+        filters = _filters(query)
+        columns = filters.pop('columns', None)
+        chunks = DatabaseConfig.iter_fact_rows(data_type, columns, EXPORT_CHUNK_ROWS, **filters)
+        try:
+            header = next(chunks)
+            # Chunk pertama diambil sebelum header HTTP agar error query masih bisa dijawab 400/503
+            rows = next(chunks, [])
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv; charset=utf-8')
+            self.send_header('Content-Disposition', f'attachment; filename="data_{data_type}.csv"')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            if self.command == 'HEAD':
+                return
+            total = 0
+            with diagnostics.timer('api', 'export', format='csv') as info:
+                self._write_chunk(_csv_chunk([header]))
+                while rows:
+                    self._write_chunk(_csv_chunk(rows))
+                    total += len(rows)
+                    rows = next(chunks, [])
+                self.wfile.write(b"0\r\n\r\n")
+                info['rows'] = total
+        finally:
+            chunks.close()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if not parts:
+            return self._send(200, json.dumps({'endpoints': ['version', 'export', *ROUTES]}).encode('utf-8'))
+
+        version = DatabaseConfig.get_data_version()
+        if parts[0] == 'version':
+            return self._send(200, json.dumps({'version': version}).encode('utf-8'),
+                              headers={'Cache-Control': 'no-cache'})
+        if parts[0] == 'export':
+            diagnostics.set_page('api:export')
+            try:
+                with DatabaseConfig.raise_errors():
+                    return self._export(parts[1:], query)
+            except (ValueError, KeyError) as e:
+                return self._error(400, str(e))
+            except Error as e:
+                return self._unavailable(e)
+        route = ROUTES.get(parts[0])
+        if route is None:
+            return self._error(404, f"Endpoint tidak dikenal: /{parts[0]}")
+
+        fmt = self._format(query)
+        # ETag = versi data + representasi yang diminta (path, query, format)
+        key = hashlib.sha1(f"{url.path}?{sorted(query.items())}|{fmt}".encode()).hexdigest()[:10]
+        etag = f'"{version}-{key}"'
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+            return self._send(304, headers=headers)
+
+        diagnostics.set_page(f"api:{parts[0]}")
+        try:
+            # Query gagal dilempar (bukan DataFrame kosong) agar tidak dijawab 200 [] dengan ETag
+            with DatabaseConfig.raise_errors(), diagnostics.timer('api', parts[0], format=fmt) as info:
+                df = route(parts[1:], query)
+                body = to_arrow(df) if fmt == 'arrow' else to_json(df)
+                info.update(rows=len(df), bytes=len(body))
+        except (ValueError, KeyError) as e:
+            return self._error(400, str(e))
+        except ImportError as e:
+            return self._error(406, str(e))
+        except Error as e:
+            return self._unavailable(e)
+        self._send(200, body, ARROW_MIME if fmt == 'arrow' else 'application/json', headers)
+
+    do_HEAD = do_GET
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=8502):
+    """Menjalankan server API sampai dihentikan (Ctrl+C)"""
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    print(f"API berjalan di http://{host}:{port}/ (backend {DatabaseConfig.READ_BACKEND})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP data polusi & kualitas hidup")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    args = parser.parse_args(argv)
+    serve(args.host, args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""Benchmark DatabaseConfig dan setiap halaman main.py
+
+Hasil (latency, jumlah baris, peak memory) disimpan ke JSON agar bisa
+dibandingkan antar versi.
+
+Penggunaan:
+    python datagen.py --kota 100000 --tahun 50 --dir snapshot_besar
+    python benchmark.py run --snapshot snapshot_besar --output baseline.json
+    python benchmark.py diff baseline.json hasil_baru.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import analytics
+import charts
+import dimensions
+import similarity
+from config import DatabaseConfig
+
+def reset_caches():
+    """Mengosongkan semua cache dalam proses (query, figure, index dimensi, kota serupa, analitik)"""
+    DatabaseConfig.invalidate_cache()
+    charts.figure_cache.clear()
+    with dimensions._index_lock:
+        dimensions._index = None
+    with similarity._indexes_lock:
+        similarity._indexes.clear()
+    with analytics._cache_lock:
+        analytics._cache.clear()
+
+
+def _sample_keys():
+    """Contoh negara, kota dan tahun dari data untuk kombinasi filter"""
+    kota = DatabaseConfig.get_all_kota()
+    if kota.empty:
+        raise RuntimeError("Data kota kosong, benchmark tidak bisa dijalankan")
+    negara = kota.groupby('kode_negara', observed=True).size().idxmax()
+    negara_row = kota[kota['kode_negara'] == negara].iloc[0]
+    polusi = DatabaseConfig.get_top_n('polusi', 'index_kualitas_udara', n=1)
+    return {
+        'kode_negara': str(negara),
+        'nama_negara': str(negara_row['nama_negara']),
+        'id_kota': int(negara_row['id_kota']),
+        'nama_kota': str(negara_row['nama_kota']),
+        'kota_ids': kota['id_kota'].head(8).astype(int).tolist(),
+        'display_names': (kota['nama_kota'].astype(str) + ' (' + kota['nama_negara'].astype(str) + ')').tolist(),
+        'tahun': int(polusi['tahun'].iloc[0]) if not polusi.empty else 2020
+    }
+
+
+def method_cases(keys):
+    """Daftar (nama, pemanggilan) metode DatabaseConfig dengan berbagai kombinasi filter"""
+    tahun = keys['tahun']
+    cases = [
+        ('get_negara_list', lambda: DatabaseConfig.get_negara_list()),
+        ('get_all_kota', lambda: DatabaseConfig.get_all_kota()),
+        ('get_kota_by_negara', lambda: DatabaseConfig.get_kota_by_negara(keys['kode_negara'])),
+        ('get_summary_stats', lambda: DatabaseConfig.get_summary_stats()),
+        ('get_comparison_data[2]', lambda: DatabaseConfig.get_comparison_data(keys['kota_ids'][:2])),
+        ('get_comparison_data[8]', lambda: DatabaseConfig.get_comparison_data(keys['kota_ids'])),
+        ('get_populasi_kota[id_kota]', lambda: DatabaseConfig.get_populasi_kota(id_kota=keys['id_kota'])),
+    ]
+    for data_type, func, indicator in [('polusi', DatabaseConfig.get_polusi_data, 'index_kualitas_udara'),
+                                       ('kualitas', DatabaseConfig.get_kualitas_hidup_data, 'index_kualitas_hidup')]:
+        cases += [
+            (f'{func.__name__}[semua]', lambda f=func: f()),
+            (f'{func.__name__}[kode_negara]', lambda f=func: f(kode_negara=keys['kode_negara'])),
+            (f'{func.__name__}[id_kota]', lambda f=func: f(id_kota=keys['id_kota'])),
+            (f'{func.__name__}[rentang_tahun]', lambda f=func: f(tahun=(tahun - 4, tahun))),
+            (f'get_latest_snapshot[{data_type}]', lambda d=data_type: DatabaseConfig.get_latest_snapshot(d)),
+            (f'get_top_n[{data_type}]', lambda d=data_type, i=indicator: DatabaseConfig.get_top_n(d, i, n=5)),
+        ]
+    return cases
+
+
+def page_cases(keys):
+    """Daftar (nama, fungsi yang mengatur widget AppTest) untuk setiap halaman dan filter"""
+    def menu(name):
+        return lambda at: at.sidebar.radio[0].set_value(name)
+
+    def filtered(name, prefix, negara=None, kota=None):
+        def apply(at):
+            at.sidebar.radio[0].set_value(name).run()
+            if negara:
+                at.selectbox(key=f"{prefix}_negara").set_value(negara).run()
+            if kota:
+                at.selectbox(key=f"{prefix}_kota").set_value(kota)
+        return apply
+
+    def compare(n):
+        def apply(at):
+            at.sidebar.radio[0].set_value("Perbandingan Data").run()
+            at.multiselect(key='kota_perbandingan').set_value(keys['display_names'][:n])
+        return apply
+
+    cases = [('page:Home', menu("Home"))]
+    for name, prefix in [("Polusi Udara", 'polusi'), ("Kualitas Hidup", 'kualitas')]:
+        cases += [
+            (f'page:{name}[semua]', filtered(name, prefix)),
+            (f'page:{name}[negara]', filtered(name, prefix, keys['nama_negara'])),
+            (f'page:{name}[kota]', filtered(name, prefix, keys['nama_negara'], keys['nama_kota'])),
+        ]
+    cases += [('page:Perbandingan Data[2]', compare(2)), ('page:Perbandingan Data[8]', compare(8))]
+    return cases
+
+
+def measure(func, repeat, warm):
+    """Menjalankan func beberapa kali, return latency (ms), jumlah baris dan peak memory (MB)"""
+    timings = []
+    rows = None
+    for _ in range(repeat):
+        if not warm:
+            reset_caches()
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+        if hasattr(result, '__len__') and not isinstance(result, str):
+            rows = len(result)
+    # Peak memory diukur di lintasan terpisah karena tracemalloc memperlambat alokasi pandas/plotly
+    if not warm:
+        reset_caches()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'rows': rows,
+        'peak_mb': round(peak / 1024 / 1024, 3)
+    }
+
+
+def run_page(apply, timeout):
+    """Menjalankan satu halaman main.py lewat AppTest, yang diukur hanya rerun terakhir"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file('main.py', default_timeout=timeout)
+    at.run()
+    apply(at)
+
+    def rerun():
+        at.run()
+        if at.exception:
+            raise RuntimeError(f"Halaman error: {at.exception[0].message}")
+        return None
+    return rerun
+
+
+def run_benchmark(repeat=5, warm=False, include_pages=True, timeout=120):
+    """Menjalankan semua kasus benchmark, return dict hasil"""
+    keys = _sample_keys()
+    results = {}
+    for name, func in method_cases(keys):
+        results[name] = measure(func, repeat, warm)
+        print(f"{name:45s} {results[name]['median_ms']:10.2f} ms  {results[name]['rows']} baris")
+    if include_pages:
+        for name, apply in page_cases(keys):
+            results[name] = measure(run_page(apply, timeout), repeat, warm)
+            print(f"{name:45s} {results[name]['median_ms']:10.2f} ms")
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def diff(old_path, new_path):
+    """Membandingkan dua file hasil benchmark"""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)['results']
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)['results']
+    print(f"{'kasus':45s} {'lama':>10s} {'baru':>10s} {'rasio':>7s} {'mem lama':>9s} {'mem baru':>9s}")
+    for name in sorted(set(old) | set(new)):
+        a, b = old.get(name), new.get(name)
+        if a is None or b is None:
+            print(f"{name:45s} {'-' if a is None else a['median_ms']:>10} {'-' if b is None else b['median_ms']:>10}")
+            continue
+        ratio = b['median_ms'] / a['median_ms'] if a['median_ms'] else float('inf')
+        print(f"{name:45s} {a['median_ms']:10.2f} {b['median_ms']:10.2f} {ratio:6.2f}x "
+              f"{a['peak_mb']:9.2f} {b['peak_mb']:9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DatabaseConfig dan halaman dashboard")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run')
+    run.add_argument('--snapshot', default=None, help="jalankan terhadap direktori snapshot, bukan MySQL")
+    run.add_argument('--repeat', type=int, default=5)
+    run.add_argument('--warm', action='store_true', help="jangan kosongkan cache (query, figure, index) di antara pengulangan")
+    run.add_argument('--no-pages', action='store_true', help="lewati benchmark halaman main.py")
+    run.add_argument('--output', default='benchmark.json')
+    cmp_parser = sub.add_parser('diff')
+    cmp_parser.add_argument('old')
+    cmp_parser.add_argument('new')
+    args = parser.parse_args(argv)
+
+    if args.command == 'diff':
+        diff(args.old, args.new)
+        return 0
+
+    if args.snapshot:
+        DatabaseConfig.READ_BACKEND = 'snapshot'
+        DatabaseConfig.SNAPSHOT_DIR = args.snapshot
+
+    results = run_benchmark(args.repeat, args.warm, not args.no_pages)
+    output = {
+        'meta': {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'backend': DatabaseConfig.READ_BACKEND,
+            'data_version': DatabaseConfig.get_data_version(),
+            'repeat': args.repeat,
+            'warm': args.warm
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2)
+    print(f"Hasil disimpan ke {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+`?(\w+)`?', re.IGNORECASE)
+
+
+def tables_in_query(query):
+    """Mendapatkan nama tabel yang dibaca oleh query"""
+    return frozenset(name.lower() for name in TABLE_PATTERN.findall(query))
+
+
+class _CacheEntry:
+    __slots__ = ('value', 'size', 'expires_at', 'tables', 'versions')
+
+    def __init__(self, value, size, expires_at, tables, versions):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.tables = tables
+        self.versions = versions
+
+
+class QueryCache:
+    """Cache hasil query (DataFrame) dengan TTL, batas memori, dan eviksi LRU"""
+
+    def __init__(self, max_bytes=128 * 1024 * 1024, default_ttl=300):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._by_table = {}
+        self._versions = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+        return entry
+
+    def get(self, key):
+        """Mengambil salinan hasil dari cache, None jika miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            stale = any(self._versions.get(t) != v for t, v in entry.versions.items())
+            if stale or entry.expires_at < time.monotonic():
+                self._remove(key)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            value = entry.value
+        return value.copy()
+
+    def put(self, key, value, tables=(), ttl=None, versions=None):
+        """Menyimpan hasil query, mengevict entry terlama jika melebihi batas memori
+
+        versions adalah versi tabel (dari versions()) yang diambil sebelum query dijalankan;
+        hasil yang tabelnya sudah berubah sejak itu tidak disimpan. None memakai versi saat ini.
+        """
+        size = int(value.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            current = {t: self._versions.get(t) for t in tables}
+            versions = current if versions is None else {t: versions.get(t) for t in tables}
+            if versions != current:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(value, size, time.monotonic() + ttl, frozenset(tables), versions)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats['evictions'] += 1
+
+    def invalidate_table(self, table):
+        """Menghapus semua entry yang membaca tabel tertentu"""
+        with self._lock:
+            keys = list(self._by_table.get(table, ()))
+            for key in keys:
+                self._remove(key)
+            self._stats['invalidations'] += len(keys)
+
+    def update_versions(self, versions):
+        """Memperbarui versi tabel dan menginvalidasi tabel yang berubah"""
+        with self._lock:
+            changed = [t for t, v in versions.items() if self._versions.get(t) != v]
+            self._versions.update(versions)
+        for table in changed:
+            self.invalidate_table(table)
+        return changed
+
+    def versions(self):
+        """Versi tabel yang terakhir diketahui"""
+        with self._lock:
+            return dict(self._versions)
+
+    def clear(self):
+        """Mengosongkan cache"""
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Statistik cache (hits, misses, eviksi, ukuran)"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        total = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / total, 4) if total else 0.0
+        return stats
+
+
+class FigureCache:
+    """Cache figure terserialisasi (string JSON) dengan batas memori dan eviksi LRU
+
+    Tidak ada invalidasi per tabel: versi data menjadi bagian key, sehingga entry versi
+    lama tidak terpakai lagi dan tergeser keluar oleh eviksi LRU. TTL sama dengan
+    QueryCache menjadi batas atas umur figure jika sebuah sumber data tidak masuk key.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, default_ttl=300):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expired': 0,
+        }
+
+    def get(self, key):
+        """Mengambil JSON figure, None jika miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._bytes -= len(value)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def put(self, key, value, ttl=None):
+        """Menyimpan JSON figure, mengevict entry terlama jika melebihi batas memori"""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        """Mengosongkan cache"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Statistik cache (hits, misses, eviksi, kedaluwarsa, ukuran)"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        total = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / total, 4) if total else 0.0
+        return stats
@@ -0,0 +1,121 @@
+"""Persiapan data chart agar ukuran figure tetap terbatas berapa pun jumlah kota"""
+import importlib
+import json
+
+import numpy as np
+
+import diagnostics
+from cache import FigureCache
+
+# Jumlah maksimum garis kota pada chart trend; sisanya diringkas menjadi band persentil
+MAX_TRACES = 10
+# Di atas jumlah titik ini chart memakai trace WebGL (scattergl)
+WEBGL_THRESHOLD = 1000
+# Jumlah titik maksimum per garis sebelum di-downsample
+MAX_POINTS_PER_TRACE = 200
+# Jumlah baris maksimum bar chart horizontal (setengah tertinggi, setengah terendah)
+MAX_BAR_ROWS = 40
+BAR_ROW_HEIGHT = 30
+# Batas memori cache figure bersama (JSON figure dari semua sesi)
+FIGURE_CACHE_BYTES = 32 * 1024 * 1024
+# Umur maksimum figure (detik), sama dengan default_ttl QueryCache
+FIGURE_CACHE_TTL = 300
+
+
+class LazyModule:
+    """Modul yang baru di-import saat atributnya pertama kali dipakai (waktu import dicatat)"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            with diagnostics.timer('import', self._name):
+                self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+# Stack plotting hanya dimuat oleh halaman yang benar-benar menggambar chart
+px = LazyModule('plotly.express')
+go = LazyModule('plotly.graph_objects')
+
+figure_cache = FigureCache(FIGURE_CACHE_BYTES, FIGURE_CACHE_TTL)
+
+
+def cached_figure(name, key, build):
+    """Figure untuk key dari cache bersama; build() hanya dipanggil jika key belum ada
+
+    Figure disimpan sebagai JSON, sehingga hit tidak menjalankan plotly express maupun
+    encoder JSON plotly, hanya json.loads. Key harus memuat semua masukan figure
+    (versi data, halaman, filter); name adalah jenis chart untuk diagnostik.
+    """
+    spec = figure_cache.get(key)
+    if spec is not None:
+        return json.loads(spec)
+    with diagnostics.timer('figure', name) as info:
+        fig = build()
+        spec = fig.to_json()
+        info['bytes'] = len(spec)
+    figure_cache.put(key, spec)
+    return fig
+
+
+def use_webgl(n_points):
+    """True jika jumlah titik cukup banyak untuk dirender dengan WebGL"""
+    return n_points > WEBGL_THRESHOLD
+
+
+def top_k_groups(df, y_col, k=MAX_TRACES, group_col='nama_kota', x_col='tahun'):
+    """Nama grup dengan nilai y tertinggi pada tahun terbaru"""
+    latest = df[df[x_col] == df[x_col].max()]
+    return latest.groupby(group_col, observed=True)[y_col].mean().nlargest(k).index.tolist()
+
+
+def split_top_k(df, y_col, k=MAX_TRACES, group_col='nama_kota', x_col='tahun'):
+    """Memisahkan baris top-k grup dan baris grup lainnya"""
+    mask = df[group_col].isin(top_k_groups(df, y_col, k, group_col, x_col))
+    return df[mask], df[~mask]
+
+
+def percentile_band(df, y_col, x_col='tahun'):
+    """Persentil 10/50/90 dan jumlah grup per nilai x"""
+    grouped = df.groupby(x_col)[y_col]
+    band = grouped.quantile([0.1, 0.5, 0.9]).unstack()
+    band.columns = ['p10', 'p50', 'p90']
+    band['jumlah'] = grouped.size()
+    return band.reset_index()
+
+
+def downsample(df, x_col, y_col, max_points=MAX_POINTS_PER_TRACE, group_col=None):
+    """Rata-rata per bucket agar setiap garis memiliki paling banyak max_points titik
+
+    y_col boleh berupa satu nama kolom atau list kolom (mis. kolom band persentil).
+    """
+    if df.empty:
+        return df
+    value_cols = [x_col] + ([y_col] if isinstance(y_col, str) else list(y_col))
+    if group_col is None:
+        if len(df) <= max_points:
+            return df
+        df = df.sort_values(x_col)
+        bucket = np.arange(len(df)) * max_points // len(df)
+        return df.groupby(bucket)[value_cols].mean().reset_index(drop=True)
+
+    grouped = df.groupby(group_col, observed=True)
+    if grouped.size().max() <= max_points:
+        return df
+    df = df.sort_values([group_col, x_col])
+    grouped = df.groupby(group_col, observed=True)
+    bucket = grouped.cumcount() * max_points // grouped[x_col].transform('size')
+    result = df.groupby([df[group_col], bucket], observed=True)[value_cols].mean()
+    return result.reset_index(level=0).reset_index(drop=True)
+
+
+def cap_bar_rows(df, x_col, max_rows=MAX_BAR_ROWS):
+    """Membatasi baris bar chart ke nilai tertinggi dan terendah, urut menaik"""
+    df_sorted = df.sort_values(x_col, ascending=True)
+    if len(df_sorted) <= max_rows:
+        return df_sorted
+    half = max_rows // 2
+    return df_sorted.iloc[np.r_[0:half, len(df_sorted) - half:len(df_sorted)]]
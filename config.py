@@ -1,7 +1,171 @@
+import contextvars
+import csv
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import lru_cache
+
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
+import numpy as np
 import pandas as pd
 
+import diagnostics
+from cache import QueryCache, tables_in_query
+
+
+WRITE_TABLE_PATTERN = re.compile(r'^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?',
+                                 re.IGNORECASE)
+
+
+class PoolTimeoutError(Error):
+    """Tidak ada koneksi pool yang tersedia dalam batas waktu"""
+
+
+class QueryError(Error):
+    """Query baca gagal (hanya dilempar di dalam DatabaseConfig.raise_errors())"""
+
+
+# True di dalam DatabaseConfig.raise_errors(): query gagal melempar QueryError, bukan DataFrame kosong
+_raise_query_errors = contextvars.ContextVar('raise_query_errors', default=False)
+
+
+class ConnectionPool:
+    """Pool koneksi database dengan ukuran terbatas"""
+
+    def __init__(self, factory, size=5, timeout=10.0, recycle=1800):
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'discarded': 0,
+        }
+
+    def _open(self):
+        """Membuat koneksi baru untuk pool"""
+        connection = self.factory()
+        if connection is None:
+            with self._lock:
+                self._created -= 1
+            raise Error("Tidak dapat membuat koneksi database")
+        connection._pool_created_at = time.monotonic()
+        with self._lock:
+            self._stats['created'] += 1
+        return connection
+
+    def _discard(self, connection, stat='discarded'):
+        """Menutup koneksi dan membebaskan slot pool"""
+        try:
+            connection.close()
+        except Error:
+            pass
+        with self._lock:
+            self._created -= 1
+            self._stats[stat] += 1
+
+    def _is_healthy(self, connection):
+        """Health check koneksi sebelum dipinjamkan"""
+        if time.monotonic() - connection._pool_created_at > self.recycle:
+            return False
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def acquire(self):
+        """Meminjam koneksi dari pool, menunggu jika pool penuh"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = None
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    connection = self._open()
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    with self._lock:
+                        self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(f"Pool koneksi penuh setelah {self.timeout} detik")
+                if not waited:
+                    waited = True
+                    with self._lock:
+                        self._stats['waits'] += 1
+                try:
+                    connection = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    continue
+
+            if self._is_healthy(connection):
+                break
+            self._discard(connection, 'recycled')
+
+        with self._lock:
+            self._stats['checkouts'] += 1
+        return connection
+
+    def release(self, connection):
+        """Mengembalikan koneksi ke pool"""
+        try:
+            # Akhiri transaksi agar snapshot baca tidak terbawa ke peminjam berikutnya
+            connection.rollback()
+        except Error:
+            self._discard(connection)
+            return
+        self._idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        """Context manager untuk meminjam dan mengembalikan koneksi"""
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def stats(self):
+        """Statistik pool (checkout, waits, timeouts, dll)"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open'] = self._created
+        stats['idle'] = self._idle.qsize()
+        stats['in_use'] = stats['open'] - stats['idle']
+        stats['size'] = self.size
+        return stats
+
+    def close_all(self):
+        """Menutup semua koneksi idle"""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(connection)
+
+
 class DatabaseConfig:
     """Konfigurasi koneksi database"""
 
@@ -13,6 +177,84 @@ class DatabaseConfig:
         'charset': 'utf8mb4'
     }
 
+    # size: jumlah koneksi maksimum, timeout: batas tunggu checkout (detik),
+    # recycle: umur maksimum koneksi sebelum dibuat ulang (detik)
+    POOL_CONFIG = {
+        'size': 5,
+        'timeout': 10.0,
+        'recycle': 1800
+    }
+
+    # chunk_size: baris per fetchmany yang di-decode ke kolom NumPy, prepared: memakai prepared
+    # statement server (protokol biner), max_statements: prepared statement yang disimpan per koneksi
+    FETCH_CONFIG = {
+        'chunk_size': 10000,
+        'prepared': True,
+        'max_statements': 32
+    }
+
+    _pool = None
+    _pool_lock = threading.Lock()
+    _executor = None
+
+    # Sumber data untuk query baca: 'mysql' atau 'snapshot' (file Arrow/Parquet lokal, lihat snapshot.py)
+    READ_BACKEND = os.environ.get('POLUSI_READ_BACKEND', 'mysql')
+    SNAPSHOT_DIR = os.environ.get('POLUSI_SNAPSHOT_DIR', 'snapshot')
+
+    # max_bytes: batas memori cache, default_ttl/dimension_ttl: umur entry (detik),
+    # probe_interval: jeda minimum antar pengecekan perubahan tabel (detik)
+    CACHE_CONFIG = {
+        'max_bytes': 128 * 1024 * 1024,
+        'default_ttl': 300,
+        'dimension_ttl': 3600,
+        'probe_interval': 5.0
+    }
+
+    # Versi per tabel dari counter yang dinaikkan trigger pada setiap INSERT/UPDATE/DELETE (migrasi 6);
+    # rollup_indikator dinaikkan oleh refresh_rollup
+    VERSION_PROBE = "SELECT tabel, versi FROM versi_tabel"
+
+    # Probe cadangan jika migrasi 6 belum diterapkan (jumlah baris + id maksimum, tidak menangkap UPDATE)
+    TABLE_PROBES = {
+        'negara': "SELECT 'negara', COUNT(*), MAX(kode_negara) FROM negara",
+        'kota': "SELECT 'kota', COUNT(*), MAX(id_kota) FROM kota",
+        'populasi_kota': "SELECT 'populasi_kota', COUNT(*), MAX(id_populasi_kota) FROM populasi_kota",
+        'polusi': "SELECT 'polusi', COUNT(*), MAX(id_polusi) FROM polusi",
+        'kualitas_hidup': "SELECT 'kualitas_hidup', COUNT(*), MAX(id_kualitas_hidup) FROM kualitas_hidup"
+    }
+
+    # Tabel turunan (diisi dari tabel lain) beserta tabel sumbernya, untuk invalidasi cache
+    DERIVED_TABLES = {
+        'ringkasan_statistik': ('negara', 'kota', 'polusi', 'kualitas_hidup'),
+        'rollup_indikator': ('negara', 'kota', 'polusi', 'kualitas_hidup')
+    }
+
+    # Hitung ulang penuh ringkasan_statistik; trigger menjaganya tetap up to date di antara refresh
+    SUMMARY_REFRESH_QUERY = """
+    REPLACE INTO ringkasan_statistik
+        (id, total_negara, total_kota, total_data_polusi, total_data_kualitas,
+         sum_polusi, count_polusi, sum_kualitas_hidup, count_kualitas_hidup)
+    SELECT 1,
+        (SELECT COUNT(*) FROM negara),
+        (SELECT COUNT(*) FROM kota),
+        (SELECT COUNT(*) FROM polusi),
+        (SELECT COUNT(*) FROM kualitas_hidup),
+        (SELECT COALESCE(SUM(index_kualitas_udara), 0) FROM polusi),
+        (SELECT COUNT(index_kualitas_udara) FROM polusi),
+        (SELECT COALESCE(SUM(index_kualitas_hidup), 0) FROM kualitas_hidup),
+        (SELECT COUNT(index_kualitas_hidup) FROM kualitas_hidup)
+    """
+
+    # Rollup statistik indikator per (benua, kode_negara, tahun); kode_negara '' = seluruh benua
+    ROLLUP_TYPES = ('polusi', 'kualitas')
+    ROLLUP_QUANTILES = {'p10': 0.1, 'p25': 0.25, 'p50': 0.5, 'p75': 0.75, 'p90': 0.9}
+    ROLLUP_COLUMNS = ['tabel', 'indikator', 'benua', 'kode_negara', 'tahun', 'jumlah', 'rata_rata',
+                      'minimum', 'maksimum', *ROLLUP_QUANTILES]
+
+    _cache = QueryCache(CACHE_CONFIG['max_bytes'], CACHE_CONFIG['default_ttl'])
+    _last_probe = 0.0
+    _probe_lock = threading.Lock()
+
     COLORS = {
         'primary': '#1f77b4',
         'secondary': '#ff7f0e',
@@ -28,6 +270,64 @@ class DatabaseConfig:
     
     COLOR_PALETTE = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', 
                      '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+    # Metadata tabel fakta, key sama dengan data_type yang dipakai di main.py
+    FACT_TABLES = {
+        'polusi': {
+            'table': 'polusi',
+            'alias': 'p',
+            'columns': ['id_polusi', 'id_kota', 'tahun', 'index_kualitas_udara', 'index_co2',
+                        'index_ozone', 'index_no2', 'pm25'],
+            'order_by': 'p.tahun, k.nama_kota'
+        },
+        'kualitas': {
+            'table': 'kualitas_hidup',
+            'alias': 'kh',
+            'columns': ['id_kualitas_hidup', 'id_kota', 'tahun', 'index_kualitas_hidup', 'index_keamanan',
+                        'index_kesehatan', 'index_pendidikan', 'index_biaya_hidup'],
+            'order_by': 'kh.tahun, k.nama_kota'
+        },
+        'populasi': {
+            'table': 'populasi_kota',
+            'alias': 'pk',
+            'columns': ['id_populasi_kota', 'id_kota', 'tahun', 'jumlah_populasi'],
+            'order_by': 'pk.tahun'
+        }
+    }
+
+    # Tipe data ringkas per nama kolom hasil query (DECIMAL -> float64, bukan float32, agar nilai 2 desimal
+    # tetap sama saat diserialisasi ke JSON/CSV; nama berulang -> category)
+    COLUMN_DTYPES = {
+        'tahun': 'int16',
+        'id_kota': 'int32',
+        'id_polusi': 'int32',
+        'id_kualitas_hidup': 'int32',
+        'id_populasi_kota': 'int32',
+        'index_kualitas_udara': 'float64',
+        'index_co2': 'float64',
+        'index_ozone': 'float64',
+        'index_no2': 'float64',
+        'pm25': 'float64',
+        'index_kualitas_hidup': 'float64',
+        'index_keamanan': 'float64',
+        'index_kesehatan': 'float64',
+        'index_pendidikan': 'float64',
+        'index_biaya_hidup': 'float64',
+        'avg_polusi': 'float64',
+        'avg_kualitas_hidup': 'float64',
+        'nama_kota': 'category',
+        'nama_negara': 'category',
+        'kode_negara': 'category',
+        'benua': 'category'
+    }
+
+    # Kolom dimensi yang bisa dipilih bersama kolom tabel fakta
+    DIMENSION_COLUMNS = {
+        'nama_kota': 'k.nama_kota',
+        'kode_negara': 'k.kode_negara',
+        'nama_negara': 'n.nama_negara',
+        'benua': 'n.benua'
+    }
     
     @staticmethod
     def get_connection():
@@ -39,30 +339,314 @@ class DatabaseConfig:
         except Error as e:
             print(f"Error koneksi database: {e}")
             return None
-    
+
+    @staticmethod
+    def get_pool():
+        """Mendapatkan pool koneksi bersama (dibuat saat pertama dipakai)"""
+        if DatabaseConfig._pool is None:
+            with DatabaseConfig._pool_lock:
+                if DatabaseConfig._pool is None:
+                    DatabaseConfig._pool = ConnectionPool(DatabaseConfig.get_connection,
+                                                          **DatabaseConfig.POOL_CONFIG)
+        return DatabaseConfig._pool
+
+    @staticmethod
+    def get_pool_stats():
+        """Mendapatkan statistik pool koneksi"""
+        return DatabaseConfig.get_pool().stats()
+
+    @staticmethod
+    def get_executor():
+        """Thread pool untuk query paralel, ukurannya sama dengan pool koneksi"""
+        if DatabaseConfig._executor is None:
+            with DatabaseConfig._pool_lock:
+                if DatabaseConfig._executor is None:
+                    DatabaseConfig._executor = ThreadPoolExecutor(
+                        max_workers=DatabaseConfig.POOL_CONFIG['size'], thread_name_prefix='db-query')
+        return DatabaseConfig._executor
+
+    @staticmethod
+    def submit_queries(calls):
+        """Menjalankan beberapa pemanggilan DatabaseConfig secara paralel
+
+        calls adalah dict nama -> fungsi tanpa argumen atau tuple (fungsi, arg1, arg2, ...).
+        Return dict nama -> Future; setiap query memakai koneksi pool sendiri sehingga
+        waktu total mengikuti query paling lambat, bukan jumlah semuanya.
+        """
+        executor = DatabaseConfig.get_executor()
+        futures = {}
+        for name, call in calls.items():
+            func, *args = call if isinstance(call, tuple) else (call,)
+            # Salin context agar halaman aktif (diagnostik) ikut tercatat di thread pekerja
+            futures[name] = executor.submit(contextvars.copy_context().run, func, *args)
+        return futures
+
+    @staticmethod
+    def run_queries(calls):
+        """Seperti submit_queries tetapi menunggu dan return dict nama -> hasil"""
+        return {name: future.result() for name, future in DatabaseConfig.submit_queries(calls).items()}
+
+    @staticmethod
+    def refresh_table_versions(force=False):
+        """Menjalankan probe perubahan tabel dan menginvalidasi cache tabel yang berubah"""
+        interval = DatabaseConfig.CACHE_CONFIG['probe_interval']
+        with DatabaseConfig._probe_lock:
+            if not force and time.monotonic() - DatabaseConfig._last_probe < interval:
+                return []
+            DatabaseConfig._last_probe = time.monotonic()
+            try:
+                with DatabaseConfig.get_pool().connection() as connection:
+                    cursor = connection.cursor()
+                    try:
+                        cursor.execute(DatabaseConfig.VERSION_PROBE)
+                        versions = {table: f"v{versi}" for table, versi in cursor.fetchall()}
+                    except Error as e:
+                        if e.errno != errorcode.ER_NO_SUCH_TABLE:
+                            raise
+                        cursor.execute(" UNION ALL ".join(DatabaseConfig.TABLE_PROBES.values()))
+                        versions = {table: f"{count}:{max_id}" for table, count, max_id in cursor.fetchall()}
+                    finally:
+                        cursor.close()
+            except Error as e:
+                print(f"Error probe tabel: {e}")
+                return []
+        return DatabaseConfig._cache.update_versions(versions)
+
+    @staticmethod
+    def invalidate_cache(*tables):
+        """Invalidasi cache untuk tabel tertentu, atau seluruh cache jika kosong"""
+        if not tables:
+            DatabaseConfig._cache.clear()
+        for table in tables:
+            DatabaseConfig._cache.invalidate_table(table)
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _query_tables(query):
+        """Tabel yang dibaca query, termasuk tabel sumber dari tabel turunan"""
+        tables = set(tables_in_query(query))
+        for table in list(tables):
+            tables.update(DatabaseConfig.DERIVED_TABLES.get(table, ()))
+        return frozenset(tables)
+
+    @staticmethod
+    def get_cache_stats():
+        """Mendapatkan statistik cache hasil query"""
+        return DatabaseConfig._cache.stats()
+
+    @staticmethod
+    def get_data_version(*tables):
+        """Versi data gabungan dari tabel tertentu (default semua), berubah jika isi tabel berubah"""
+        if DatabaseConfig.READ_BACKEND == 'snapshot':
+            import snapshot
+            return snapshot.get_engine(DatabaseConfig.SNAPSHOT_DIR).version
+        DatabaseConfig.refresh_table_versions()
+        versions = DatabaseConfig._cache.versions()
+        raw = '|'.join(f"{t}={versions.get(t)}" for t in sorted(tables or versions))
+        return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+    @staticmethod
+    def compact_dtypes(df):
+        """Mengubah kolom hasil query ke tipe data ringkas sesuai COLUMN_DTYPES"""
+        for col in df.columns:
+            dtype = DatabaseConfig.COLUMN_DTYPES.get(col)
+            if dtype is None or df[col].dtype == dtype:
+                continue
+            # Kolom integer dengan NULL dibiarkan (float64) agar tidak gagal konversi
+            if dtype.startswith('int') and df[col].isna().any():
+                continue
+            df[col] = df[col].astype(dtype)
+        return df
+
     @staticmethod
-    def execute_query(query, params=None):
+    @contextmanager
+    def raise_errors():
+        """Di dalam blok ini query yang gagal melempar QueryError alih-alih mengembalikan DataFrame kosong
+
+        Dashboard tetap memakai DataFrame kosong (halaman menampilkan peringatan), sedangkan
+        pemanggil seperti api.py perlu membedakan hasil kosong dari query yang gagal.
+        """
+        token = _raise_query_errors.set(True)
+        try:
+            yield
+        finally:
+            _raise_query_errors.reset(token)
+
+    @staticmethod
+    def _execute_snapshot(query, params=None):
+        """Eksekusi query terhadap snapshot kolumnar lokal"""
+        with diagnostics.timer('query', diagnostics.current_call.get() or 'execute_query',
+                               backend='snapshot') as info:
+            try:
+                import snapshot
+                df = snapshot.get_engine(DatabaseConfig.SNAPSHOT_DIR).query(query, params)
+            except Exception as e:
+                print(f"Error eksekusi query snapshot: {e}")
+                info['error'] = str(e)
+                if _raise_query_errors.get():
+                    raise QueryError(str(e)) from e
+                return pd.DataFrame()
+            df = DatabaseConfig.compact_dtypes(df)
+            info['rows'] = len(df)
+            info['bytes'] = int(df.memory_usage(deep=False).sum())
+            return df
+
+    @staticmethod
+    def _decode_column(values, dtype=None):
+        """Nilai satu kolom dari satu chunk -> array NumPy; dtype None ditebak dari nilainya"""
+        if dtype is None:
+            sample = next((v for v in values if v is not None), None)
+            if sample is None:
+                return np.full(len(values), np.nan)
+            if isinstance(sample, int):
+                dtype = 'int64'
+            elif isinstance(sample, (float, Decimal)):
+                dtype = 'float64'
+        if dtype is None or dtype == 'category':
+            return np.array(values, dtype=object)
+        try:
+            return np.array(values, dtype=dtype)
+        except (TypeError, ValueError, OverflowError):
+            # NULL di kolom integer: float64 dengan NaN, sama seperti compact_dtypes membiarkannya
+            return np.array(values, dtype='float64')
+
+    @staticmethod
+    def _close_cursor(cursor):
+        try:
+            cursor.close()
+        except Error:
+            pass
+
+    @staticmethod
+    def _prepared_cursor(connection, query):
+        """Cursor prepared statement untuk query, disimpan per koneksi (prepare sekali, execute berulang)"""
+        cursors = getattr(connection, '_prepared_cursors', None)
+        if cursors is None:
+            cursors = connection._prepared_cursors = OrderedDict()
+        cursor = cursors.get(query)
+        if cursor is not None:
+            cursors.move_to_end(query)
+            return cursor
+        cursor = cursors[query] = connection.cursor(prepared=True)
+        while len(cursors) > DatabaseConfig.FETCH_CONFIG['max_statements']:
+            # Menutup cursor juga men-deallocate statement di server
+            DatabaseConfig._close_cursor(cursors.popitem(last=False)[1])
+        return cursor
+
+    @staticmethod
+    def fetch_frame(connection, query, params=None, compact=True):
+        """Eksekusi SELECT dan decode hasilnya per chunk langsung ke kolom NumPy
+
+        Memakai prepared statement yang disimpan per koneksi sehingga query yang sama
+        tidak di-parse ulang oleh server dan nilai numerik dikirim dalam protokol biner.
+        compact=True memakai tipe dari COLUMN_DTYPES, selain itu tipe ditebak dari
+        nilainya (int64, float64, object) seperti pd.read_sql.
+        """
+        prepared = DatabaseConfig.FETCH_CONFIG['prepared']
+        cursor = DatabaseConfig._prepared_cursor(connection, query) if prepared else connection.cursor()
+        try:
+            cursor.execute(query, params or ())
+            names = [d[0] for d in cursor.description]
+            dtypes = [DatabaseConfig.COLUMN_DTYPES.get(name) if compact else None for name in names]
+            parts = [[] for _ in names]
+            while True:
+                rows = cursor.fetchmany(DatabaseConfig.FETCH_CONFIG['chunk_size'])
+                if not rows:
+                    break
+                # Tuple baris hanya hidup selama satu chunk
+                for part, dtype, values in zip(parts, dtypes, zip(*rows)):
+                    part.append(DatabaseConfig._decode_column(values, dtype))
+        except Exception:
+            # Hasil yang belum habis dibaca membuat cursor tidak bisa dipakai ulang
+            if prepared:
+                connection._prepared_cursors.pop(query, None)
+            DatabaseConfig._close_cursor(cursor)
+            raise
+        if not prepared:
+            cursor.close()
+
+        columns = {}
+        for name, dtype, part in zip(names, dtypes, parts):
+            if len(part) > 1:
+                values = np.concatenate(part)
+            elif part:
+                values = part[0]
+            else:
+                values = np.array([], dtype=dtype if dtype not in (None, 'category') else object)
+            columns[name] = pd.Categorical(values) if dtype == 'category' else values
+        return pd.DataFrame(columns, columns=names, copy=False)
+
+    @staticmethod
+    def execute_query(query, params=None, ttl=None, use_cache=True):
         """Eksekusi query dan return DataFrame"""
-        connection = DatabaseConfig.get_connection()
-        if connection:
+        if DatabaseConfig.READ_BACKEND == 'snapshot':
+            return DatabaseConfig._execute_snapshot(query, params)
+        key = (query, tuple(params) if params else None)
+        with diagnostics.timer('query', diagnostics.current_call.get() or 'execute_query',
+                               backend='mysql', cache_hit=False) as info:
+            if use_cache:
+                DatabaseConfig.refresh_table_versions()
+                df = DatabaseConfig._cache.get(key)
+                if df is not None:
+                    info.update(cache_hit=True, rows=len(df))
+                    return df
+                # Versi sebelum query: hasil yang tabelnya berubah selama query berjalan tidak dianggap terbaru
+                versions = DatabaseConfig._cache.versions()
+            start = time.perf_counter()
             try:
-                df = pd.read_sql(query, connection, params=params)
-                return df
+                with DatabaseConfig.get_pool().connection() as connection:
+                    info['connect_ms'] = round((time.perf_counter() - start) * 1000, 3)
+                    info['prepared'] = DatabaseConfig.FETCH_CONFIG['prepared']
+                    df = DatabaseConfig.fetch_frame(connection, query, params)
             except Error as e:
                 print(f"Error eksekusi query: {e}")
+                info['error'] = str(e)
+                if _raise_query_errors.get():
+                    raise QueryError(str(e)) from e
                 return pd.DataFrame()
+            df = DatabaseConfig.compact_dtypes(df)
+            info['rows'] = len(df)
+            info['bytes'] = int(df.memory_usage(deep=False).sum())
+            if use_cache:
+                DatabaseConfig._cache.put(key, df, DatabaseConfig._query_tables(query), ttl, versions)
+                df = df.copy()
+            return df
+
+    @staticmethod
+    def execute_statement(query, params=None, many=False):
+        """Eksekusi query tulis (INSERT/UPDATE/DELETE) dan return jumlah baris terdampak"""
+        with DatabaseConfig.get_pool().connection() as connection:
+            cursor = connection.cursor()
+            try:
+                if many:
+                    cursor.executemany(query, params)
+                else:
+                    cursor.execute(query, params)
+                connection.commit()
+                return cursor.rowcount
             finally:
-                if connection.is_connected():
-                    connection.close()
-        return pd.DataFrame()
+                cursor.close()
+                DatabaseConfig.invalidate_cache(*DatabaseConfig._write_tables(query))
+
+    @staticmethod
+    def _write_tables(query):
+        """Tabel yang ditulis oleh query INSERT/REPLACE/UPDATE/DELETE"""
+        match = WRITE_TABLE_PATTERN.search(query)
+        if not match:
+            return ()
+        table = match.group(1).lower()
+        derived = [name for name, sources in DatabaseConfig.DERIVED_TABLES.items() if table in sources]
+        return (table, *derived)
     
     @staticmethod
+    @diagnostics.track_call
     def get_negara_list():
         """Mendapatkan list negara"""
         query = "SELECT kode_negara, nama_negara, benua FROM negara ORDER BY nama_negara"
-        return DatabaseConfig.execute_query(query)
+        return DatabaseConfig.execute_query(query, ttl=DatabaseConfig.CACHE_CONFIG['dimension_ttl'])
     
     @staticmethod
+    @diagnostics.track_call
     def get_kota_by_negara(kode_negara):
         """Mendapatkan list kota berdasarkan negara"""
         query = """
@@ -72,9 +656,11 @@ class DatabaseConfig:
         WHERE k.kode_negara = %s
         ORDER BY k.nama_kota
         """
-        return DatabaseConfig.execute_query(query, params=(str(kode_negara),))
+        return DatabaseConfig.execute_query(query, params=(str(kode_negara),),
+                                            ttl=DatabaseConfig.CACHE_CONFIG['dimension_ttl'])
     
     @staticmethod
+    @diagnostics.track_call
     def get_all_kota():
         """Mendapatkan semua kota dengan info negara"""
         query = """
@@ -83,90 +669,524 @@ class DatabaseConfig:
         JOIN negara n ON k.kode_negara = n.kode_negara
         ORDER BY n.nama_negara, k.nama_kota
         """
-        return DatabaseConfig.execute_query(query)
+        return DatabaseConfig.execute_query(query, ttl=DatabaseConfig.CACHE_CONFIG['dimension_ttl'])
     
     @staticmethod
-    def get_polusi_data(id_kota=None, tahun=None):
-        """Mendapatkan data polusi"""
-        query = """
-        SELECT p.*, k.nama_kota, n.nama_negara
-        FROM polusi p
-        JOIN kota k ON p.id_kota = k.id_kota
-        JOIN negara n ON k.kode_negara = n.kode_negara
-        WHERE 1=1
+    def _fact_where(data_type, id_kota=None, tahun=None, kode_negara=None, kota_ids=None, benua=None):
+        """Menyusun klausa WHERE tabel fakta (alias k dan n untuk kota dan negara)"""
+        shape, params = DatabaseConfig._fact_filter_shape(id_kota, tahun, kode_negara, kota_ids, benua)
+        return DatabaseConfig._fact_where_sql(data_type, *shape), params
+
+    @staticmethod
+    def _fact_filter_shape(id_kota=None, tahun=None, kode_negara=None, kota_ids=None, benua=None):
+        """Bentuk filter (filter mana yang dipakai) dan params-nya
+
+        Teks SQL hanya bergantung pada bentuk sehingga bisa di-cache; per panggilan
+        hanya params yang dihitung.
         """
         params = []
-        
         if id_kota:
-            query += " AND p.id_kota = %s"
             params.append(int(id_kota))
-        
-        if tahun:
-            query += " AND p.tahun = %s"
+        jumlah_kota = None
+        if kota_ids is not None:
+            kota_ids = [int(i) for i in kota_ids]
+            jumlah_kota = len(kota_ids)
+            params.extend(kota_ids)
+        if kode_negara:
+            params.append(str(kode_negara))
+        if benua:
+            params.append(str(benua))
+
+        if isinstance(tahun, str) and tahun == 'latest':
+            bentuk_tahun = 'latest'
+        elif isinstance(tahun, (tuple, list)):
+            tahun_awal, tahun_akhir = tahun
+            bentuk_tahun = (tahun_awal is not None, tahun_akhir is not None)
+            params.extend(int(t) for t in tahun if t is not None)
+        elif tahun:
+            bentuk_tahun = 'eq'
             params.append(int(tahun))
-        
-        query += " ORDER BY p.tahun, k.nama_kota"
-        
-        return DatabaseConfig.execute_query(query, params=tuple(params) if params else None)
-    
+        else:
+            bentuk_tahun = None
+
+        return (bool(id_kota), jumlah_kota, bool(kode_negara), bool(benua), bentuk_tahun), params
+
     @staticmethod
-    def get_kualitas_hidup_data(id_kota=None, tahun=None):
-        """Mendapatkan data kualitas hidup"""
-        query = """
-        SELECT kh.*, k.nama_kota, n.nama_negara
-        FROM kualitas_hidup kh
-        JOIN kota k ON kh.id_kota = k.id_kota
+    @lru_cache(maxsize=256)
+    def _fact_where_sql(data_type, id_kota, jumlah_kota, kode_negara, benua, bentuk_tahun):
+        """Teks klausa WHERE untuk satu bentuk filter (lihat _fact_filter_shape)"""
+        fact = DatabaseConfig.FACT_TABLES[data_type]
+        alias = fact['alias']
+        where = "WHERE 1=1"
+
+        if id_kota:
+            where += f" AND {alias}.id_kota = %s"
+
+        if jumlah_kota is not None:
+            if jumlah_kota:
+                where += f" AND {alias}.id_kota IN ({', '.join(['%s'] * jumlah_kota)})"
+            else:
+                where += " AND 1=0"
+
+        if kode_negara:
+            where += " AND k.kode_negara = %s"
+
+        if benua:
+            where += " AND n.benua = %s"
+
+        if bentuk_tahun == 'latest':
+            where += f" AND {alias}.tahun = (SELECT MAX(tahun) FROM {fact['table']})"
+        elif isinstance(bentuk_tahun, tuple):
+            if bentuk_tahun[0]:
+                where += f" AND {alias}.tahun >= %s"
+            if bentuk_tahun[1]:
+                where += f" AND {alias}.tahun <= %s"
+        elif bentuk_tahun == 'eq':
+            where += f" AND {alias}.tahun = %s"
+
+        return where
+
+    @staticmethod
+    def _build_fact_query(data_type, id_kota=None, tahun=None, kode_negara=None, kota_ids=None,
+                          benua=None, columns=None, latest_per_kota=False, order_by=None, limit=None,
+                          after=None):
+        """Menyusun query tabel fakta dengan filter di sisi server
+
+        tahun='latest' membatasi ke tahun terbaru di tabel, latest_per_kota=True
+        mengambil baris tahun terbaru masing-masing kota. after=(tahun, id_kota)
+        mengambil baris setelah posisi tersebut pada urutan tahun, id_kota menurun.
+        Teks query di-cache per bentuk filter, sehingga panggilan berulang memakai objek
+        string yang sama (kunci cache hasil dan prepared statement per koneksi).
+        """
+        shape, params = DatabaseConfig._fact_filter_shape(id_kota, tahun, kode_negara, kota_ids, benua)
+        if after is not None:
+            params += [int(after[0]), int(after[0]), int(after[1])]
+        if limit:
+            params.append(int(limit))
+        query = DatabaseConfig._fact_query_sql(data_type, tuple(columns) if columns else None, latest_per_kota,
+                                               order_by, after is not None, bool(limit), shape)
+        return query, tuple(params) if params else None
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _fact_query_sql(data_type, columns, latest_per_kota, order_by, after, limit, shape):
+        """Teks query tabel fakta untuk satu bentuk filter (lihat _build_fact_query)"""
+        fact = DatabaseConfig.FACT_TABLES[data_type]
+        alias = fact['alias']
+
+        if columns:
+            select = []
+            for col in columns:
+                if col in fact['columns']:
+                    select.append(f"{alias}.{col}")
+                elif col in DatabaseConfig.DIMENSION_COLUMNS:
+                    select.append(f"{DatabaseConfig.DIMENSION_COLUMNS[col]} AS {col}")
+                else:
+                    raise ValueError(f"Kolom tidak dikenal untuk {data_type}: {col}")
+            select_clause = ", ".join(select)
+        else:
+            select_clause = f"{alias}.*, k.nama_kota, n.nama_negara"
+
+        query = f"""
+        SELECT {select_clause}
+        FROM {fact['table']} {alias}
+        JOIN kota k ON {alias}.id_kota = k.id_kota
         JOIN negara n ON k.kode_negara = n.kode_negara
-        WHERE 1=1
         """
-        params = []
-        
-        if id_kota:
-            query += " AND kh.id_kota = %s"
-            params.append(int(id_kota))
-        
-        if tahun:
-            query += " AND kh.tahun = %s"
-            params.append(int(tahun))
-        
-        query += " ORDER BY kh.tahun, k.nama_kota"
-        
-        return DatabaseConfig.execute_query(query, params=tuple(params) if params else None)
+        if latest_per_kota:
+            # Memakai unique index (id_kota, tahun) sehingga MAX per kota dibaca dari index
+            query += f"""JOIN (SELECT id_kota, MAX(tahun) AS tahun FROM {fact['table']} GROUP BY id_kota) lt
+            ON lt.id_kota = {alias}.id_kota AND lt.tahun = {alias}.tahun
+        """
+        query += DatabaseConfig._fact_where_sql(data_type, *shape)
+
+        if after:
+            # Keyset pagination: bentuk OR agar index (tahun, id_kota) tetap dipakai
+            query += f" AND ({alias}.tahun < %s OR ({alias}.tahun = %s AND {alias}.id_kota < %s))"
+
+        query += f" ORDER BY {order_by or fact['order_by']}"
+
+        if limit:
+            query += " LIMIT %s"
+
+        return query
+
+    @staticmethod
+    @diagnostics.track_call
+    def get_polusi_data(id_kota=None, tahun=None, kode_negara=None, kota_ids=None, benua=None, columns=None):
+        """Mendapatkan data polusi
+
+        tahun dapat berupa satu tahun atau rentang (tahun_awal, tahun_akhir),
+        columns membatasi kolom yang diambil (lihat FACT_TABLES dan DIMENSION_COLUMNS).
+        """
+        query, params = DatabaseConfig._build_fact_query('polusi', id_kota, tahun, kode_negara,
+                                                         kota_ids, benua, columns)
+        return DatabaseConfig.execute_query(query, params=params)
     
     @staticmethod
-    def get_populasi_kota(id_kota=None):
-        """Mendapatkan data populasi kota"""
-        query = """
-        SELECT pk.*, k.nama_kota, n.nama_negara
-        FROM populasi_kota pk
-        JOIN kota k ON pk.id_kota = k.id_kota
+    @diagnostics.track_call
+    def get_kualitas_hidup_data(id_kota=None, tahun=None, kode_negara=None, kota_ids=None, benua=None,
+                                columns=None):
+        """Mendapatkan data kualitas hidup (filter sama dengan get_polusi_data)"""
+        query, params = DatabaseConfig._build_fact_query('kualitas', id_kota, tahun, kode_negara,
+                                                         kota_ids, benua, columns)
+        return DatabaseConfig.execute_query(query, params=params)
+    
+    @staticmethod
+    @diagnostics.track_call
+    def get_populasi_kota(id_kota=None, tahun=None, kode_negara=None, kota_ids=None, benua=None, columns=None):
+        """Mendapatkan data populasi kota (filter sama dengan get_polusi_data)"""
+        query, params = DatabaseConfig._build_fact_query('populasi', id_kota, tahun, kode_negara,
+                                                         kota_ids, benua, columns)
+        return DatabaseConfig.execute_query(query, params=params)
+    
+    @staticmethod
+    @diagnostics.track_call
+    def get_latest_snapshot(data_type='polusi', kode_negara=None, kota_ids=None, benua=None, columns=None,
+                            id_kota=None):
+        """Mendapatkan data tahun terbaru masing-masing kota"""
+        query, params = DatabaseConfig._build_fact_query(data_type, id_kota=id_kota, kode_negara=kode_negara,
+                                                         kota_ids=kota_ids, benua=benua, columns=columns,
+                                                         latest_per_kota=True)
+        return DatabaseConfig.execute_query(query, params=params)
+
+    @staticmethod
+    @diagnostics.track_call
+    def get_top_n(data_type, indicator, n=5, ascending=False, tahun='latest', kode_negara=None,
+                  kota_ids=None, benua=None, id_kota=None, columns=None):
+        """Mendapatkan n kota dengan nilai indikator tertinggi (atau terendah jika ascending)
+
+        Default memakai tahun terbaru di tabel; urutan dan LIMIT dievaluasi di database.
+        columns menambahkan kolom lain (mis. indikator pembanding) ke hasil.
+        """
+        fact = DatabaseConfig.FACT_TABLES[data_type]
+        if indicator not in fact['columns']:
+            raise ValueError(f"Indikator tidak dikenal untuk {data_type}: {indicator}")
+        order_by = f"{fact['alias']}.{indicator} {'ASC' if ascending else 'DESC'}, k.nama_kota"
+        columns = list(dict.fromkeys(['id_kota', 'tahun', indicator, 'nama_kota', 'nama_negara'] +
+                                     list(columns or [])))
+        query, params = DatabaseConfig._build_fact_query(data_type, id_kota=id_kota, tahun=tahun,
+                                                         kode_negara=kode_negara, kota_ids=kota_ids, benua=benua,
+                                                         columns=columns, order_by=order_by, limit=n)
+        return DatabaseConfig.execute_query(query, params=params)
+    
+    @staticmethod
+    @diagnostics.track_call
+    def get_tahun_list(data_type='polusi'):
+        """Daftar tahun yang tersedia di tabel fakta, terbaru dulu"""
+        query = f"SELECT DISTINCT tahun FROM {DatabaseConfig.FACT_TABLES[data_type]['table']} ORDER BY tahun DESC"
+        return DatabaseConfig.execute_query(query, ttl=DatabaseConfig.CACHE_CONFIG['dimension_ttl'])
+
+    @staticmethod
+    @diagnostics.track_call
+    def get_rollup(data_type, indicator, level='benua', benua=None, kode_negara=None, tahun=None):
+        """Statistik indikator per tahun dari rollup_indikator
+
+        level='benua' mengembalikan satu baris per benua per tahun, level='negara'
+        satu baris per negara (bisa dibatasi ke satu benua atau satu negara).
+        """
+        if indicator not in DatabaseConfig.FACT_TABLES[data_type]['columns'][3:]:
+            raise ValueError(f"Indikator tidak dikenal untuk {data_type}: {indicator}")
+        if level not in ('benua', 'negara'):
+            raise ValueError(f"Level rollup tidak dikenal: {level}")
+        stats = ", ".join(f"r.{col}" for col in DatabaseConfig.ROLLUP_COLUMNS[5:])
+        query = f"""
+        SELECT r.benua, r.kode_negara, n.nama_negara, r.tahun, {stats}
+        FROM rollup_indikator r
+        LEFT JOIN negara n ON r.kode_negara = n.kode_negara
+        WHERE r.tabel = %s AND r.indikator = %s AND r.kode_negara {'=' if level == 'benua' else '<>'} ''
+        """
+        params = [data_type, indicator]
+        if benua:
+            query += " AND r.benua = %s"
+            params.append(str(benua))
+        if kode_negara:
+            query += " AND r.kode_negara = %s"
+            params.append(str(kode_negara))
+        if isinstance(tahun, (tuple, list)):
+            query += " AND r.tahun BETWEEN %s AND %s"
+            params += [int(tahun[0]), int(tahun[1])]
+        elif tahun:
+            query += " AND r.tahun = %s"
+            params.append(int(tahun))
+        query += " ORDER BY r.benua, r.kode_negara, r.tahun"
+        return DatabaseConfig.execute_query(query, params=params)
+
+    @staticmethod
+    @diagnostics.track_call
+    def get_drilldown(data_type, indicator, benua=None, kode_negara=None, tahun=None):
+        """Drill-down benua -> negara -> kota
+
+        Tanpa filter: rollup per benua; dengan benua: rollup per negara di benua tersebut;
+        dengan kode_negara: data kota di negara tersebut dari tabel fakta.
+        """
+        if kode_negara:
+            columns = ['id_kota', 'nama_kota', 'tahun', indicator]
+            query, params = DatabaseConfig._build_fact_query(data_type, tahun=tahun, kode_negara=kode_negara,
+                                                             columns=columns)
+            return DatabaseConfig.execute_query(query, params=params)
+        if benua:
+            return DatabaseConfig.get_rollup(data_type, indicator, 'negara', benua=benua, tahun=tahun)
+        return DatabaseConfig.get_rollup(data_type, indicator, 'benua', tahun=tahun)
+
+    @staticmethod
+    @diagnostics.track_call
+    def get_comparison_data(kota_ids):
+        """Mendapatkan data polusi dan kualitas hidup beberapa kota dalam satu query
+
+        Hanya tahun yang memiliki data polusi dan kualitas hidup untuk semua kota yang dikembalikan,
+        dan dalam satu tahun urutan kota mengikuti urutan kota_ids.
+        """
+        kota_ids = list(dict.fromkeys(int(i) for i in kota_ids))
+        if not kota_ids:
+            return pd.DataFrame()
+        placeholders = ', '.join(['%s'] * len(kota_ids))
+        query = f"""
+        SELECT p.id_kota, p.tahun, k.nama_kota, n.nama_negara,
+            p.index_kualitas_udara, p.index_co2, p.index_ozone, p.index_no2, p.pm25,
+            kh.index_kualitas_hidup, kh.index_keamanan, kh.index_kesehatan,
+            kh.index_pendidikan, kh.index_biaya_hidup
+        FROM polusi p
+        JOIN kualitas_hidup kh ON kh.id_kota = p.id_kota AND kh.tahun = p.tahun
+        JOIN kota k ON p.id_kota = k.id_kota
         JOIN negara n ON k.kode_negara = n.kode_negara
-        WHERE 1=1
+        WHERE p.id_kota IN ({placeholders})
+        AND p.tahun IN (
+            SELECT p2.tahun
+            FROM polusi p2
+            JOIN kualitas_hidup kh2 ON kh2.id_kota = p2.id_kota AND kh2.tahun = p2.tahun
+            WHERE p2.id_kota IN ({placeholders})
+            GROUP BY p2.tahun
+            HAVING COUNT(DISTINCT p2.id_kota) = %s
+        )
+        ORDER BY p.tahun, k.nama_kota
         """
-        params = []
-        
-        if id_kota:
-            query += " AND pk.id_kota = %s"
-            params.append(int(id_kota))
-        
-        query += " ORDER BY pk.tahun"
-        
-        return DatabaseConfig.execute_query(query, params=tuple(params) if params else None)
+        params = tuple(kota_ids) + tuple(kota_ids) + (len(kota_ids),)
+        df = DatabaseConfig.execute_query(query, params=params)
+        if df.empty:
+            return df
+        urutan = df['id_kota'].map({id_kota: i for i, id_kota in enumerate(kota_ids)})
+        return df.assign(_urutan=urutan).sort_values(['tahun', '_urutan']).drop(columns='_urutan')
     
     @staticmethod
+    @diagnostics.track_call
+    def count_fact_rows(data_type, id_kota=None, tahun=None, kode_negara=None, kota_ids=None, benua=None):
+        """Menghitung jumlah baris tabel fakta sesuai filter"""
+        fact = DatabaseConfig.FACT_TABLES[data_type]
+        alias = fact['alias']
+        where, params = DatabaseConfig._fact_where(data_type, id_kota, tahun, kode_negara, kota_ids, benua)
+        if kode_negara or benua:
+            query = f"""
+            SELECT COUNT(*) AS total
+            FROM {fact['table']} {alias}
+            JOIN kota k ON {alias}.id_kota = k.id_kota
+            JOIN negara n ON k.kode_negara = n.kode_negara
+            {where}
+            """
+        else:
+            # Tanpa filter dimensi cukup hitung dari index tabel fakta (FK menjamin kotanya ada)
+            query = f"SELECT COUNT(*) AS total FROM {fact['table']} {alias} {where} AND {alias}.id_kota IS NOT NULL"
+        df = DatabaseConfig.execute_query(query, params=tuple(params) if params else None)
+        return int(df['total'].iloc[0]) if not df.empty else 0
+
+    @staticmethod
+    def _page_columns(columns):
+        """Kolom halaman selalu menyertakan tahun dan id_kota untuk posisi keyset"""
+        return list(dict.fromkeys(list(columns or []) + ['tahun', 'id_kota']))
+
+    @staticmethod
+    @diagnostics.track_call
+    def get_fact_page(data_type, columns=None, after=None, limit=100, **filters):
+        """Mendapatkan satu halaman data fakta urut tahun, id_kota menurun (keyset pagination)
+
+        after adalah (tahun, id_kota) baris terakhir halaman sebelumnya, None untuk halaman pertama.
+        """
+        alias = DatabaseConfig.FACT_TABLES[data_type]['alias']
+        query, params = DatabaseConfig._build_fact_query(
+            data_type, columns=DatabaseConfig._page_columns(columns), after=after, limit=limit,
+            order_by=f"{alias}.tahun DESC, {alias}.id_kota DESC", **filters)
+        return DatabaseConfig.execute_query(query, params=params)
+
+    @staticmethod
+    def iter_fact_rows(data_type, columns=None, chunk_size=5000, **filters):
+        """Generator baris data fakta per chunk (list of tuple) tanpa memuat semuanya ke memori
+
+        Chunk pertama yang di-yield adalah header (nama kolom).
+        """
+        columns = list(columns or DatabaseConfig.FACT_TABLES[data_type]['columns'] + ['nama_kota', 'nama_negara'])
+        yield columns
+        if DatabaseConfig.READ_BACKEND == 'snapshot':
+            # Snapshot tidak punya cursor streaming, jadi dibaca per halaman keyset
+            after = None
+            while True:
+                page = DatabaseConfig.get_fact_page(data_type, columns, after, chunk_size, **filters)
+                if page.empty:
+                    return
+                yield list(page[columns].itertuples(index=False, name=None))
+                after = (page['tahun'].iloc[-1], page['id_kota'].iloc[-1])
+
+        alias = DatabaseConfig.FACT_TABLES[data_type]['alias']
+        query, params = DatabaseConfig._build_fact_query(
+            data_type, columns=columns, order_by=f"{alias}.tahun DESC, {alias}.id_kota DESC", **filters)
+        with DatabaseConfig.get_pool().connection() as connection:
+            # Cursor unbuffered: baris diambil dari server per fetchmany
+            cursor = connection.cursor(buffered=False)
+            try:
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+            finally:
+                try:
+                    cursor.close()
+                except Error:
+                    # Hasil yang belum habis dibaca: koneksi dibuang pool saat rollback gagal
+                    pass
+
+    @staticmethod
+    def export_fact_csv(file, data_type, columns=None, chunk_size=5000, **filters):
+        """Menulis data fakta ke file CSV (text mode) per chunk, return jumlah baris"""
+        writer = csv.writer(file)
+        chunks = DatabaseConfig.iter_fact_rows(data_type, columns, chunk_size, **filters)
+        writer.writerow(next(chunks))
+        total = 0
+        for rows in chunks:
+            writer.writerows(rows)
+            total += len(rows)
+        return total
+
+    @staticmethod
+    @diagnostics.track_call
     def get_summary_stats():
-        """Mendapatkan statistik ringkasan"""
+        """Mendapatkan statistik ringkasan dari tabel ringkasan_statistik (satu baris)"""
         query = """
         SELECT 
-            COUNT(DISTINCT n.kode_negara) as total_negara,
-            COUNT(DISTINCT k.id_kota) as total_kota,
-            COUNT(DISTINCT p.id_polusi) as total_data_polusi,
-            COUNT(DISTINCT kh.id_kualitas_hidup) as total_data_kualitas,
-            ROUND(AVG(p.index_kualitas_udara), 2) as avg_polusi,
-            ROUND(AVG(kh.index_kualitas_hidup), 2) as avg_kualitas_hidup
-        FROM negara n
-        LEFT JOIN kota k ON n.kode_negara = k.kode_negara
-        LEFT JOIN polusi p ON k.id_kota = p.id_kota
-        LEFT JOIN kualitas_hidup kh ON k.id_kota = kh.id_kota
-        """
-        return DatabaseConfig.execute_query(query)
\ No newline at end of file
+            total_negara,
+            total_kota,
+            total_data_polusi,
+            total_data_kualitas,
+            ROUND(sum_polusi / NULLIF(count_polusi, 0), 2) as avg_polusi,
+            ROUND(sum_kualitas_hidup / NULLIF(count_kualitas_hidup, 0), 2) as avg_kualitas_hidup
+        FROM ringkasan_statistik
+        WHERE id = 1
+        """
+        df = DatabaseConfig.execute_query(query)
+        if df.empty:
+            # Tabel ringkasan belum dibuat (migrasi belum dijalankan): hitung langsung per tabel
+            query = """
+            SELECT 
+                (SELECT COUNT(*) FROM negara) as total_negara,
+                (SELECT COUNT(*) FROM kota) as total_kota,
+                (SELECT COUNT(*) FROM polusi) as total_data_polusi,
+                (SELECT COUNT(*) FROM kualitas_hidup) as total_data_kualitas,
+                (SELECT ROUND(AVG(index_kualitas_udara), 2) FROM polusi) as avg_polusi,
+                (SELECT ROUND(AVG(index_kualitas_hidup), 2) FROM kualitas_hidup) as avg_kualitas_hidup
+            """
+            df = DatabaseConfig.execute_query(query)
+        return df
+
+    @staticmethod
+    def refresh_summary_stats():
+        """Menghitung ulang tabel ringkasan_statistik dari tabel sumber"""
+        return DatabaseConfig.execute_statement(DatabaseConfig.SUMMARY_REFRESH_QUERY)
+
+    @staticmethod
+    def _rollup_rows(df, data_type, indicators):
+        """Baris rollup_indikator (level negara dan benua) dari data fakta benua, kode_negara, tahun, indikator"""
+        long = df.melt(id_vars=['benua', 'kode_negara', 'tahun'], value_vars=indicators,
+                       var_name='indikator', value_name='nilai').dropna(subset=['nilai'])
+        long['nilai'] = long['nilai'].astype('float64')
+        frames = []
+        for level_df in (long, long.assign(kode_negara='')):
+            grouped = level_df.groupby(['indikator', 'benua', 'kode_negara', 'tahun'])['nilai']
+            stats = grouped.agg(jumlah='count', rata_rata='mean', minimum='min', maksimum='max')
+            quantiles = grouped.quantile(list(DatabaseConfig.ROLLUP_QUANTILES.values())).unstack()
+            quantiles.columns = list(DatabaseConfig.ROLLUP_QUANTILES)
+            frames.append(stats.join(quantiles))
+        result = pd.concat(frames).reset_index()
+        result.insert(0, 'tabel', data_type)
+        result = result[DatabaseConfig.ROLLUP_COLUMNS]
+        return list(result.astype(object).itertuples(index=False, name=None))
+
+    @staticmethod
+    def _bump_version(cursor, table):
+        """Menaikkan versi tabel yang tidak dijaga trigger (mis. tabel turunan yang di-refresh)"""
+        try:
+            cursor.execute("UPDATE versi_tabel SET versi = versi + 1 WHERE tabel = %s", (table,))
+        except Error as e:
+            # Migrasi 6 belum diterapkan: probe cadangan tidak membaca versi_tabel
+            if e.errno != errorcode.ER_NO_SUCH_TABLE:
+                raise
+
+    @staticmethod
+    def refresh_rollup(full=False):
+        """Menghitung ulang rollup_indikator untuk grup yang ditandai trigger di rollup_dirty
+
+        Grup (kode_negara, tahun) yang berubah dihitung ulang bersama benua-nya. full=True
+        menghitung ulang semuanya, diperlukan jika kode_negara kota atau benua negara
+        berubah (tidak ditangkap trigger). Return jumlah baris rollup yang ditulis.
+
+        Setiap tipe data diproses dalam transaksinya sendiri: tanda dikunci (FOR UPDATE)
+        sebelum data fakta dibaca, sehingga penulis yang menandai grup yang sama sudah
+        commit (perubahannya ikut terbaca) atau menunggu sampai refresh commit lalu
+        menandai ulang grupnya. Tanda yang dihapus tidak pernah menelan perubahan baru.
+        """
+        columns = ", ".join(DatabaseConfig.ROLLUP_COLUMNS)
+        insert = (f"INSERT INTO rollup_indikator ({columns}) "
+                  f"VALUES ({', '.join(['%s'] * len(DatabaseConfig.ROLLUP_COLUMNS))})")
+        written = 0
+        with DatabaseConfig.get_pool().connection() as connection:
+            cursor = connection.cursor()
+            try:
+                for data_type in DatabaseConfig.ROLLUP_TYPES:
+                    fact = DatabaseConfig.FACT_TABLES[data_type]
+                    alias = fact['alias']
+                    indicators = fact['columns'][3:]
+                    select = f"""
+                    SELECT n.benua, k.kode_negara, {alias}.tahun, {', '.join(f'{alias}.{c}' for c in indicators)}
+                    FROM {fact['table']} {alias}
+                    JOIN kota k ON {alias}.id_kota = k.id_kota
+                    JOIN negara n ON k.kode_negara = n.kode_negara
+                    """
+                    # Locking read sebelum read biasa pertama: snapshot transaksi dibuat setelah kunci didapat
+                    cursor.execute("SELECT kode_negara, tahun FROM rollup_dirty WHERE tabel = %s FOR UPDATE",
+                                   (data_type,))
+                    dirty = cursor.fetchall()
+                    if not full and not dirty:
+                        connection.commit()
+                        continue
+                    if full:
+                        df = DatabaseConfig.fetch_frame(connection, select, compact=False)
+                        cursor.execute("DELETE FROM rollup_indikator WHERE tabel = %s", (data_type,))
+                    else:
+                        cursor.execute("SELECT kode_negara, benua FROM negara")
+                        benua_by_negara = dict(cursor.fetchall())
+                        groups = sorted({(benua_by_negara[kode], tahun) for kode, tahun in dirty
+                                         if kode in benua_by_negara})
+                        df = pd.DataFrame(columns=['benua', 'kode_negara', 'tahun', *indicators])
+                        if groups:
+                            benua_list = sorted({benua for benua, _ in groups})
+                            tahun_list = sorted({tahun for _, tahun in groups})
+                            df = DatabaseConfig.fetch_frame(
+                                connection,
+                                select + f"WHERE n.benua IN ({', '.join(['%s'] * len(benua_list))}) "
+                                         f"AND {alias}.tahun IN ({', '.join(['%s'] * len(tahun_list))})",
+                                benua_list + tahun_list, compact=False)
+                            df = df[pd.MultiIndex.from_frame(df[['benua', 'tahun']]).isin(groups)]
+                            cursor.executemany("DELETE FROM rollup_indikator WHERE tabel = %s AND benua = %s "
+                                               "AND tahun = %s", [(data_type, b, t) for b, t in groups])
+                    rows = DatabaseConfig._rollup_rows(df, data_type, indicators) if not df.empty else []
+                    if rows:
+                        cursor.executemany(insert, rows)
+                    if dirty:
+                        cursor.executemany("DELETE FROM rollup_dirty WHERE tabel = %s AND kode_negara = %s "
+                                           "AND tahun = %s", [(data_type, k, t) for k, t in dirty])
+                    written += len(rows)
+                    DatabaseConfig._bump_version(cursor, 'rollup_indikator')
+                    connection.commit()
+            finally:
+                cursor.close()
+                DatabaseConfig.invalidate_cache('rollup_indikator')
+        return written
@@ -0,0 +1,126 @@
+"""Generator data sintetis sesuai skema DB.sql
+
+Data ditulis sebagai snapshot lokal (lihat snapshot.py) sehingga dashboard dan
+benchmark bisa dijalankan pada skala besar tanpa MySQL.
+
+Penggunaan:
+    python datagen.py --kota 100000 --tahun 50 --dir snapshot_besar
+    POLUSI_READ_BACKEND=snapshot POLUSI_SNAPSHOT_DIR=snapshot_besar streamlit run main.py
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BENUA = ['Amerika', 'Amerika Selatan', 'Eropa', 'Asia', 'Oceania', 'Afrika']
+
+
+def _kode_negara(n):
+    """Kode negara 3 huruf unik (AAA, AAB, ...)"""
+    idx = np.arange(n)
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    return [''.join(x) for x in zip(letters[idx // 676 % 26], letters[idx // 26 % 26], letters[idx % 26])]
+
+
+def _indicator(rng, base, trend, size, low, high):
+    """Nilai indikator dengan level per kota, tren per tahun, dan noise, dibulatkan 2 desimal"""
+    values = base + trend + rng.normal(0, 3, size)
+    return np.round(np.clip(values, low, high), 2)
+
+
+def generate(n_negara=22, n_kota=40, n_tahun=5, tahun_awal=2020, seed=42):
+    """Membuat DataFrame negara, kota, populasi_kota, polusi dan kualitas_hidup"""
+    if n_negara > 26 ** 3:
+        raise ValueError("Maksimum 17576 negara (kode 3 huruf)")
+    rng = np.random.default_rng(seed)
+
+    kode = _kode_negara(n_negara)
+    negara = pd.DataFrame({
+        'kode_negara': kode,
+        'nama_negara': [f"Negara {k}" for k in kode],
+        'benua': np.array(BENUA)[rng.integers(0, len(BENUA), n_negara)],
+        'created_at': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, n_negara), unit='D')
+    })
+
+    id_kota = np.arange(1, n_kota + 1)
+    kota = pd.DataFrame({
+        'id_kota': id_kota,
+        'kode_negara': np.array(kode)[rng.integers(0, n_negara, n_kota)],
+        'nama_kota': [f"Kota {i}" for i in id_kota]
+    })
+
+    # Satu baris per (kota, tahun), urut tahun lalu kota
+    tahun = np.arange(tahun_awal, tahun_awal + n_tahun)
+    fact_kota = np.tile(id_kota, n_tahun)
+    fact_tahun = np.repeat(tahun, n_kota)
+    size = n_kota * n_tahun
+    step = (fact_tahun - tahun_awal).astype(float)
+    fact_ids = np.arange(1, size + 1)
+
+    base_polusi = rng.uniform(20, 160, n_kota)[fact_kota - 1]
+    polusi = pd.DataFrame({
+        'id_polusi': fact_ids,
+        'id_kota': fact_kota,
+        'tahun': fact_tahun,
+        'index_kualitas_udara': _indicator(rng, base_polusi, -0.8 * step, size, 0, 9999),
+        'index_co2': _indicator(rng, base_polusi * 0.6, -0.5 * step, size, 0, 9999),
+        'index_ozone': _indicator(rng, base_polusi * 0.4, 0.2 * step, size, 0, 9999),
+        'index_no2': _indicator(rng, base_polusi * 0.3, -0.3 * step, size, 0, 9999),
+        'pm25': _indicator(rng, base_polusi * 0.5, -0.6 * step, size, 0, 9999)
+    })
+
+    base_hidup = rng.uniform(30, 90, n_kota)[fact_kota - 1]
+    kualitas_hidup = pd.DataFrame({
+        'id_kualitas_hidup': fact_ids,
+        'id_kota': fact_kota,
+        'tahun': fact_tahun,
+        'index_kualitas_hidup': _indicator(rng, base_hidup, 0.4 * step, size, 0, 100),
+        'index_keamanan': _indicator(rng, base_hidup, 0.2 * step, size, 0, 100),
+        'index_kesehatan': _indicator(rng, base_hidup, 0.3 * step, size, 0, 100),
+        'index_pendidikan': _indicator(rng, base_hidup, 0.3 * step, size, 0, 100),
+        'index_biaya_hidup': _indicator(rng, 100 - base_hidup, 0.5 * step, size, 0, 100)
+    })
+
+    base_populasi = rng.lognormal(13, 1, n_kota)[fact_kota - 1]
+    populasi_kota = pd.DataFrame({
+        'id_populasi_kota': fact_ids,
+        'id_kota': fact_kota,
+        'tahun': fact_tahun,
+        'jumlah_populasi': (base_populasi * (1 + 0.01 * step)).astype(np.int64)
+    })
+
+    return {
+        'negara': negara,
+        'kota': kota,
+        'populasi_kota': populasi_kota,
+        'polusi': polusi,
+        'kualitas_hidup': kualitas_hidup
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generator data sintetis polusi & kualitas hidup")
+    parser.add_argument('--negara', type=int, default=200)
+    parser.add_argument('--kota', type=int, default=10000)
+    parser.add_argument('--tahun', type=int, default=20)
+    parser.add_argument('--tahun-awal', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dir', default='snapshot_sintetis', help="direktori snapshot tujuan")
+    parser.add_argument('--format', choices=['arrow', 'parquet'], default='arrow')
+    args = parser.parse_args(argv)
+
+    import snapshot
+
+    start = time.perf_counter()
+    frames = generate(args.negara, args.kota, args.tahun, args.tahun_awal, args.seed)
+    version = f"sintetis-{args.seed}-{args.negara}-{args.kota}-{args.tahun}"
+    snapshot.write_snapshot(args.dir, frames, version, args.format)
+    rows = sum(len(df) for df in frames.values())
+    print(f"{rows} baris ditulis ke {args.dir} dalam {time.perf_counter() - start:.2f} detik")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
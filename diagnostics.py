@@ -0,0 +1,213 @@
+"""Instrumentasi ringan untuk query DatabaseConfig dan render halaman
+
+Setiap event (query, pemanggilan DatabaseConfig, render helper, halaman)
+disimpan di ring buffer in-memory berukuran tetap, lalu bisa dilihat di
+panel diagnostik sidebar atau diekspor sebagai JSON / format teks Prometheus.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+MAX_EVENTS = 5000
+
+_events = deque(maxlen=MAX_EVENTS)
+_lock = threading.Lock()
+
+current_page = contextvars.ContextVar('current_page', default=None)
+current_call = contextvars.ContextVar('current_call', default=None)
+
+
+def set_max_events(max_events):
+    """Mengubah kapasitas ring buffer (mis. untuk load test), event terbaru dipertahankan"""
+    global _events, MAX_EVENTS
+    with _lock:
+        _events = deque(_events, maxlen=max_events)
+        MAX_EVENTS = max_events
+
+
+def rss_mb():
+    """Resident memory proses saat ini (MB); puncak RSS jika /proc tidak tersedia, 0 di Windows"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def set_page(page):
+    """Menandai halaman yang sedang dirender untuk event berikutnya"""
+    current_page.set(page)
+
+
+def record(kind, name, wall_ms, **fields):
+    """Menyimpan satu event ke ring buffer"""
+    event = {
+        'ts': time.time(),
+        'kind': kind,
+        'name': name,
+        'wall_ms': round(wall_ms, 3),
+        'page': current_page.get(),
+        'call': current_call.get()
+    }
+    event.update(fields)
+    with _lock:
+        _events.append(event)
+    return event
+
+
+@contextmanager
+def timer(kind, name, **fields):
+    """Context manager pengukur waktu; field tambahan bisa diisi lewat dict yang di-yield"""
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        record(kind, name, (time.perf_counter() - start) * 1000, **fields)
+
+
+def timed(kind='render'):
+    """Decorator untuk mengukur waktu fungsi (mis. render helper di main.py)"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(kind, func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def track_call(func):
+    """Decorator untuk metode DatabaseConfig: mengukur waktu dan jumlah baris hasil"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = current_call.set(func.__name__)
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            current_call.reset(token)
+        rows = len(result) if hasattr(result, '__len__') else None
+        record('call', func.__name__, (time.perf_counter() - start) * 1000, rows=rows)
+        return result
+    return wrapper
+
+
+def events(kind=None, limit=None):
+    """Salinan event di ring buffer, terbaru di akhir"""
+    with _lock:
+        items = list(_events)
+    if kind:
+        items = [e for e in items if e['kind'] == kind]
+    return items[-limit:] if limit else items
+
+
+def clear():
+    """Mengosongkan ring buffer"""
+    with _lock:
+        _events.clear()
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summary():
+    """Agregasi event per (kind, name): jumlah, total, p50, p95, max, baris dan byte"""
+    groups = {}
+    for event in events():
+        groups.setdefault((event['kind'], event['name']), []).append(event)
+    result = []
+    for (kind, name), items in sorted(groups.items()):
+        walls = sorted(e['wall_ms'] for e in items)
+        result.append({
+            'kind': kind,
+            'name': name,
+            'count': len(items),
+            'total_ms': round(sum(walls), 3),
+            'p50_ms': _percentile(walls, 0.5),
+            'p95_ms': _percentile(walls, 0.95),
+            'max_ms': walls[-1],
+            'rows': sum(e.get('rows') or 0 for e in items),
+            'bytes': sum(e.get('bytes') or 0 for e in items),
+            'errors': sum(1 for e in items if e.get('error'))
+        })
+    return result
+
+
+def export_json(path=None):
+    """Ekspor event mentah dan ringkasan sebagai JSON (ditulis ke path jika diberikan)"""
+    data = json.dumps({'summary': summary(), 'events': events()}, indent=2, default=str)
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+    return data
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def export_prometheus(path=None, gauges=None):
+    """Ekspor ringkasan dalam format teks Prometheus; gauges = {nama: {label: nilai}} tambahan"""
+    lines = [
+        '# HELP polusi_duration_seconds Durasi query, pemanggilan DatabaseConfig dan render',
+        '# TYPE polusi_duration_seconds summary'
+    ]
+    rows_lines = ['# HELP polusi_rows_total Jumlah baris hasil', '# TYPE polusi_rows_total counter']
+    error_lines = ['# HELP polusi_errors_total Jumlah event error', '# TYPE polusi_errors_total counter']
+    for item in summary():
+        labels = f'kind="{_label(item["kind"])}",name="{_label(item["name"])}"'
+        for q, key in [('0.5', 'p50_ms'), ('0.95', 'p95_ms')]:
+            lines.append(f'polusi_duration_seconds{{{labels},quantile="{q}"}} {item[key] / 1000:.6f}')
+        lines.append(f'polusi_duration_seconds_sum{{{labels}}} {item["total_ms"] / 1000:.6f}')
+        lines.append(f'polusi_duration_seconds_count{{{labels}}} {item["count"]}')
+        rows_lines.append(f'polusi_rows_total{{{labels}}} {item["rows"]}')
+        error_lines.append(f'polusi_errors_total{{{labels}}} {item["errors"]}')
+    lines += rows_lines + error_lines
+    for metric, values in (gauges or {}).items():
+        lines.append(f'# TYPE polusi_{metric} gauge')
+        for key, value in values.items():
+            if isinstance(value, (int, float)):
+                lines.append(f'polusi_{metric}{{key="{_label(key)}"}} {value}')
+    data = '\n'.join(lines) + '\n'
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(data)
+    return data
+
+
+def render_panel(st, gauges=None):
+    """Panel diagnostik (dipanggil di dalam st.sidebar)"""
+    import pandas as pd
+
+    st.markdown("---")
+    if not st.checkbox("Tampilkan diagnostik", key='diagnostik'):
+        return
+    data = summary()
+    if not data:
+        st.caption("Belum ada data diagnostik")
+        return
+    df = pd.DataFrame(data).sort_values('total_ms', ascending=False)
+    st.dataframe(df[['kind', 'name', 'count', 'p50_ms', 'p95_ms', 'max_ms', 'rows']],
+                 use_container_width=True, hide_index=True)
+    recent = pd.DataFrame(events(limit=50)).iloc[::-1]
+    st.caption("Event terbaru")
+    st.dataframe(recent, use_container_width=True, hide_index=True)
+    for name, values in (gauges or {}).items():
+        st.caption(f"{name}: " + ", ".join(f"{k}={v}" for k, v in values.items()))
+    st.download_button("Ekspor JSON", export_json(), file_name='diagnostik.json', mime='application/json')
+    st.download_button("Ekspor Prometheus", export_prometheus(gauges=gauges), file_name='diagnostik.prom',
+                       mime='text/plain')
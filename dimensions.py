@@ -0,0 +1,92 @@
+"""Index in-memory dimensi negara dan kota, dipakai bersama oleh semua sesi
+
+Dibangun sekali dari get_negara_list/get_all_kota dan dibangun ulang hanya jika
+versi data tabel negara/kota berubah. Semua lookup (nama -> kode, negara -> kota,
+kota -> negara, benua -> negara, label tampilan -> id_kota) berupa dict.
+"""
+import threading
+
+from config import DatabaseConfig
+
+SOURCE_TABLES = ('negara', 'kota')
+
+
+class DimensionIndex:
+    """Lookup negara/kota yang sudah dihitung di muka"""
+
+    def __init__(self, negara, kota, version=None):
+        self.version = version
+        # Urutan sama dengan query sumber: negara per nama, kota per negara lalu nama
+        self.negara_names = [str(n) for n in negara.get('nama_negara', [])]
+        self.kode_by_nama = {}
+        self.negara_by_kode = {}
+        self.negara_by_benua = {}
+        for kode, nama, benua in zip(negara.get('kode_negara', []), negara.get('nama_negara', []),
+                                     negara.get('benua', [])):
+            kode, nama, benua = str(kode), str(nama), str(benua)
+            self.kode_by_nama.setdefault(nama, kode)
+            self.negara_by_kode[kode] = {'nama_negara': nama, 'benua': benua}
+            self.negara_by_benua.setdefault(benua, []).append(kode)
+
+        self.kota_by_negara = {}
+        self.negara_by_kota = {}
+        self.nama_by_kota = {}
+        self.labels = []
+        self.id_by_label = {}
+        self._id_by_negara_nama = {}
+        for id_kota, nama_kota, nama_negara, kode in zip(kota.get('id_kota', []), kota.get('nama_kota', []),
+                                                         kota.get('nama_negara', []), kota.get('kode_negara', [])):
+            id_kota, nama_kota, kode = int(id_kota), str(nama_kota), str(kode)
+            label = f"{nama_kota} ({nama_negara})"
+            self.kota_by_negara.setdefault(kode, []).append(nama_kota)
+            self.negara_by_kota[id_kota] = kode
+            self.nama_by_kota[id_kota] = nama_kota
+            self._id_by_negara_nama.setdefault((kode, nama_kota), id_kota)
+            self.labels.append(label)
+            self.id_by_label.setdefault(label, id_kota)
+
+    @classmethod
+    def load(cls):
+        """Membangun index dari DatabaseConfig (query dimensi memakai cache)"""
+        version = DatabaseConfig.get_data_version(*SOURCE_TABLES)
+        return cls(DatabaseConfig.get_negara_list(), DatabaseConfig.get_all_kota(), version)
+
+    def kota_names(self, kode_negara):
+        """Nama kota dalam satu negara, urut nama"""
+        return self.kota_by_negara.get(kode_negara, [])
+
+    def id_kota(self, kode_negara, nama_kota):
+        """id_kota dari kode negara dan nama kota"""
+        return self._id_by_negara_nama[(kode_negara, nama_kota)]
+
+    def ids_for_labels(self, labels):
+        """id_kota untuk daftar label tampilan, urutan dipertahankan"""
+        return [self.id_by_label[label] for label in labels]
+
+    def benua_of(self, kode_negara):
+        """Benua suatu negara"""
+        return self.negara_by_kode[kode_negara]['benua']
+
+    def __len__(self):
+        return len(self.nama_by_kota)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Index dimensi bersama untuk versi data saat ini"""
+    global _index
+    version = DatabaseConfig.get_data_version(*SOURCE_TABLES)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index.version != version:
+            index = DimensionIndex.load()
+            # Query dimensi gagal/kosong: jangan disimpan agar dicoba lagi pada rerun berikutnya
+            if not len(index):
+                return index
+            _index = index
+        return _index
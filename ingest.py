@@ -0,0 +1,181 @@
+"""Ingest massal data tahunan (polusi, kualitas_hidup, populasi_kota) dari CSV/Parquet
+
+Baris dibaca per batch, divalidasi terhadap tabel kota, lalu di-upsert per
+(id_kota, tahun) dengan executemany dalam satu transaksi per batch. Posisi
+terakhir yang sudah di-commit disimpan di file state sehingga ingest yang
+gagal bisa dilanjutkan; batch yang terulang aman karena upsert idempoten.
+Membutuhkan migrasi versi 4 (primary key tabel fakta AUTO_INCREMENT).
+
+Penggunaan:
+    python ingest.py polusi polusi_2025.csv
+    python ingest.py kualitas kualitas_2025.parquet --batch-size 20000
+    python ingest.py polusi polusi_2025.csv --restart   # abaikan state, mulai dari awal
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+from mysql.connector import Error
+
+from config import DatabaseConfig
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def fact_columns(data_type):
+    """Kolom yang di-ingest untuk tipe data (tanpa primary key)"""
+    return DatabaseConfig.FACT_TABLES[data_type]['columns'][1:]
+
+
+def upsert_query(data_type):
+    """INSERT ... ON DUPLICATE KEY UPDATE pada unique key (id_kota, tahun)"""
+    table = DatabaseConfig.FACT_TABLES[data_type]['table']
+    columns = fact_columns(data_type)
+    values = [c for c in columns if c not in ('id_kota', 'tahun')]
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in values)}")
+
+
+def read_batches(path, batch_size):
+    """Membaca file CSV atau Parquet sebagai DataFrame per batch"""
+    if path.lower().endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Ingest Parquet membutuhkan paket 'pyarrow' (pip install pyarrow)") from e
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=batch_size)
+
+
+def validate(df, data_type, valid_kota):
+    """Memisahkan baris valid dan baris ditolak (dengan kolom alasan)"""
+    columns = fact_columns(data_type)
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Kolom tidak ada di file input: {', '.join(missing)}")
+    df = df[columns].copy()
+    for column in columns:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+
+    reason = pd.Series(None, index=df.index, dtype=object)
+    reason[~df['id_kota'].isin(valid_kota)] = 'id_kota tidak ada di tabel kota'
+    reason[df['id_kota'].isna() | df['tahun'].isna()] = 'id_kota/tahun kosong atau bukan angka'
+    rejected = df[reason.notna()].assign(alasan=reason[reason.notna()])
+    valid = df[reason.isna()]
+    # Duplikat (id_kota, tahun) dalam satu batch: baris terakhir yang menang, sama seperti upsert
+    valid = valid.drop_duplicates(['id_kota', 'tahun'], keep='last')
+    valid = valid.astype({'id_kota': 'int64', 'tahun': 'int64'})
+    return valid, rejected
+
+
+def to_rows(df):
+    """DataFrame ke list tuple nilai Python (NaN -> NULL)"""
+    df = df.astype(object).where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
+
+
+def load_state(state_path, source):
+    """State ingest sebelumnya untuk file yang sama, None jika tidak ada / file berubah"""
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path, encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('source') != source:
+        return None
+    return state
+
+
+def save_state(state_path, state):
+    """Menyimpan state secara atomik"""
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def ingest(data_type, path, batch_size=DEFAULT_BATCH_SIZE, state_path=None, rejects_path=None, restart=False):
+    """Ingest satu file ke tabel fakta, return dict statistik"""
+    state_path = state_path or f"{path}.ingest.json"
+    rejects_path = rejects_path or f"{path}.rejects.csv"
+    stat = os.stat(path)
+    source = {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime, 'data_type': data_type}
+    state = None if restart else load_state(state_path, source)
+    if state is None:
+        state = {'source': source, 'rows_done': 0, 'upserted': 0, 'rejected': 0, 'done': False}
+        if os.path.exists(rejects_path):
+            os.remove(rejects_path)
+    if state['done']:
+        print(f"{path} sudah selesai di-ingest (hapus {state_path} atau pakai --restart untuk mengulang)")
+        return state
+
+    # Ingest selalu ke MySQL (bukan snapshot), dan error baca kota harus menghentikan ingest
+    with DatabaseConfig.get_pool().connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT id_kota FROM kota")
+        valid_kota = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    query = upsert_query(data_type)
+
+    skip = state['rows_done']
+    if skip:
+        print(f"Melanjutkan dari baris {skip}")
+    start = time.perf_counter()
+    offset = 0
+    processed = 0
+    for chunk in read_batches(path, batch_size):
+        chunk_start = offset
+        offset += len(chunk)
+        if offset <= skip:
+            continue
+        if chunk_start < skip:
+            chunk = chunk.iloc[skip - chunk_start:]
+
+        valid, rejected = validate(chunk, data_type, valid_kota)
+        if not valid.empty:
+            DatabaseConfig.execute_statement(query, to_rows(valid), many=True)
+        if not rejected.empty:
+            rejected.to_csv(rejects_path, mode='a', index=False, header=not os.path.exists(rejects_path))
+
+        processed += len(chunk)
+        state.update(rows_done=offset, upserted=state['upserted'] + len(valid),
+                     rejected=state['rejected'] + len(rejected))
+        save_state(state_path, state)
+        elapsed = time.perf_counter() - start
+        print(f"{offset} baris ({processed / elapsed:,.0f} baris/detik), ditolak {state['rejected']}")
+
+    state['done'] = True
+    save_state(state_path, state)
+    elapsed = time.perf_counter() - start
+    state['elapsed_s'] = round(elapsed, 3)
+    state['rows_per_s'] = round(processed / elapsed, 1) if elapsed else None
+    return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest massal data fakta dari CSV/Parquet")
+    parser.add_argument('data_type', choices=list(DatabaseConfig.FACT_TABLES))
+    parser.add_argument('path', help="file .csv atau .parquet")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--state', default=None, help="file state untuk resume (default <path>.ingest.json)")
+    parser.add_argument('--rejects', default=None, help="file CSV baris ditolak (default <path>.rejects.csv)")
+    parser.add_argument('--restart', action='store_true', help="abaikan state dan mulai dari awal")
+    args = parser.parse_args(argv)
+
+    try:
+        result = ingest(args.data_type, args.path, args.batch_size, args.state, args.rejects, args.restart)
+    except (Error, ValueError) as e:
+        print(f"Error ingest: {e} (jalankan ulang perintah yang sama untuk melanjutkan)")
+        return 1
+    print(f"Selesai: {result['upserted']} baris di-upsert, {result['rejected']} ditolak"
+          + (f" dalam {result['elapsed_s']:.2f} detik ({result['rows_per_s']:,.0f} baris/detik)"
+             if result.get('rows_per_s') else ""))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,436 @@
+"""Load test satu server Streamlit (main.py) dengan banyak sesi browser bersamaan
+
+Untuk setiap tingkat jumlah sesi dijalankan satu server `python warmup.py` (atau
+dipakai server yang sudah berjalan lewat --url), lalu N sesi browser tiruan
+dibuka lewat websocket Streamlit (/_stcore/stream) dari satu event loop. Semua
+sesi berbagi satu proses server seperti di produksi, sehingga pool koneksi
+MySQL, cache query dan cache figure ikut dibagi dan antrean pool benar-benar
+menunjukkan apakah koneksi database menjadi bottleneck.
+
+Setiap sesi menjalankan navigasi acak yang realistis (ganti menu, ganti filter
+negara/kota, memilih kota perbandingan). Latency rerun diukur di sisi klien dari
+BackMsg rerun sampai script_finished. Dilaporkan throughput rerun, latency
+p50/p95/p99, error rate, lalu dari endpoint /stats server (POLUSI_STATS_PORT,
+lihat warmup.py): query DB per rerun, cache hit, waktu query vs render, antrean
+dan timeout pool serta memori server per sesi. Rerun yang gagal tidak dihitung
+di latency maupun throughput, dan sesi tersebut dibuka ulang.
+
+Penggunaan:
+    python datagen.py --kota 10000 --tahun 20 --dir snapshot_sintetis
+    python loadtest.py --snapshot snapshot_sintetis --sessions 1,5,10,20 --duration 60
+    python loadtest.py --sessions 1,5,10 --duration 30 --output loadtest.json   # MySQL lokal
+    python loadtest.py --url http://replika:8501 --stats-url http://replika:8503 --sessions 10,20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.request import urlopen
+
+from config import DatabaseConfig
+
+MENUS = ["Home", "Polusi Udara", "Kualitas Hidup", "Perbandingan Data"]
+MENU_LABEL = "Menu Navigasi"
+FILTER_PAGES = [("Polusi Udara", 'polusi'), ("Kualitas Hidup", 'kualitas')]
+# Batas ukuran pesan websocket, sama dengan default server.maxMessageSize Streamlit
+MAX_MESSAGE_BYTES = 200 * 1024 * 1024
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+class RerunFailed(Exception):
+    """Rerun gagal (exception halaman, timeout, koneksi putus); sesi dibuka ulang"""
+
+
+class WidgetNotFound(Exception):
+    """Widget yang dibutuhkan aksi tidak ada di halaman; sesi dibuka ulang"""
+
+
+class BrowserSession:
+    """Satu sesi browser tiruan: websocket ke server dan state widget seperti frontend Streamlit
+
+    Widget dikenali dari elemen radio/selectbox/multiselect pada delta rerun terakhir;
+    id widget berakhiran "-<key>" jika widget diberi key. Nilai widget dikirim sebagai
+    indeks opsi (int_value / int_array_value), sama seperti frontend.
+    """
+
+    def __init__(self, url, timeout, samples):
+        self.url = url
+        self.timeout = timeout
+        self.samples = samples
+        self.ws = None
+        self.widgets = {}
+        self.states = {}
+        self.values = {}
+        # hash ForwardMsg -> (id, widget) untuk pesan yang dikirim ulang server sebagai ref_hash
+        self._by_hash = {}
+
+    async def connect(self):
+        """Membuka websocket dan menjalankan load awal halaman"""
+        from tornado.websocket import websocket_connect
+
+        start = time.perf_counter()
+        try:
+            self.ws = await asyncio.wait_for(
+                websocket_connect(self.url.replace('http', 'ws', 1).rstrip('/') + '/_stcore/stream',
+                                  max_message_size=MAX_MESSAGE_BYTES), self.timeout)
+        except Exception as e:  # server menolak koneksi, timeout handshake
+            self.samples.append(('load', (time.perf_counter() - start) * 1000, False))
+            raise RerunFailed(f"{type(e).__name__}: {e}") from e
+        await self.rerun('load')
+
+    def close(self):
+        """Menutup websocket; state widget ikut dibuang seperti tab browser yang ditutup"""
+        if self.ws is not None:
+            self.ws.close()
+        self.ws = None
+        self.widgets, self.states, self.values = {}, {}, {}
+
+    async def rerun(self, action):
+        """Mengirim rerun dengan state widget saat ini dan menunggu script selesai"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        start = time.perf_counter()
+        try:
+            await self.ws.write_message(msg.SerializeToString(), binary=True)
+            error = await asyncio.wait_for(self._read_run(), self.timeout)
+        except Exception as e:  # timeout rerun, websocket putus
+            error = f"{type(e).__name__}: {e}"
+        self.samples.append((action, (time.perf_counter() - start) * 1000, error is None))
+        if error is not None:
+            raise RerunFailed(error)
+
+    async def _read_run(self):
+        """Membaca ForwardMsg sampai script_finished, return pesan error halaman atau None"""
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        widgets = {}
+        error = None
+        while True:
+            data = await self.ws.read_message()
+            if data is None:
+                return "Websocket ditutup server"
+            msg = ForwardMsg()
+            msg.ParseFromString(data)
+            kind = msg.WhichOneof('type')
+            if kind == 'ref_hash' and msg.ref_hash in self._by_hash:
+                widget_id, widget = self._by_hash[msg.ref_hash]
+                widgets[widget_id] = widget
+            elif kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                element = msg.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type == 'exception':
+                    error = error or element.exception.message
+                elif element_type in ('radio', 'selectbox', 'multiselect'):
+                    proto = getattr(element, element_type)
+                    widget = (element_type, proto.label, list(proto.options))
+                    widgets[proto.id] = widget
+                    if msg.hash:
+                        self._by_hash[msg.hash] = (proto.id, widget)
+            elif kind == 'script_finished':
+                if msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    error = error or "Compile error main.py"
+                # Widget yang tidak tampil lagi tidak dikirim di rerun berikutnya
+                self.widgets = widgets
+                self.states = {i: s for i, s in self.states.items() if i in widgets}
+                self.values = {i: v for i, v in self.values.items() if i in widgets}
+                return error
+
+    def find(self, widget_type, key=None, label=None):
+        """(id, opsi) widget pada halaman saat ini berdasarkan key atau label"""
+        for widget_id, (found_type, found_label, options) in self.widgets.items():
+            if found_type != widget_type:
+                continue
+            if (key is None or widget_id.endswith(f"-{key}")) and (label is None or found_label == label):
+                return widget_id, options
+        raise WidgetNotFound(f"{widget_type} {key or label} tidak ada di halaman")
+
+    def value(self, widget_id, options):
+        """Nilai widget yang terakhir di-set sesi ini, default opsi pertama"""
+        return self.values.get(widget_id, options[0] if options else None)
+
+    def set_value(self, widget_id, widget_type, options, value):
+        """Mengisi state widget untuk rerun berikutnya"""
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState(id=widget_id)
+        if widget_type == 'multiselect':
+            state.int_array_value.data.extend(options.index(v) for v in value)
+        else:
+            state.int_value = options.index(value)
+        self.states[widget_id] = state
+        self.values[widget_id] = value
+
+
+async def open_page(session, page):
+    """Pindah ke menu tertentu jika belum di sana"""
+    menu_id, options = session.find('radio', label=MENU_LABEL)
+    if session.value(menu_id, options) != page:
+        session.set_value(menu_id, 'radio', options, page)
+        await session.rerun('menu')
+
+
+async def switch_menu(session, rng):
+    """Pindah ke menu acak"""
+    menu_id, options = session.find('radio', label=MENU_LABEL)
+    session.set_value(menu_id, 'radio', options, rng.choice(MENUS))
+    await session.rerun('menu')
+
+
+async def change_filter(session, rng):
+    """Buka halaman polusi/kualitas lalu pilih negara acak, kadang juga kota acak"""
+    page, prefix = rng.choice(FILTER_PAGES)
+    await open_page(session, page)
+    negara_id, options = session.find('selectbox', key=f"{prefix}_negara")
+    negara = rng.choice(options)
+    session.set_value(negara_id, 'selectbox', options, negara)
+    await session.rerun('filter_negara')
+    if negara != 'Semua Negara' and rng.random() < 0.5:
+        kota_id, options = session.find('selectbox', key=f"{prefix}_kota")
+        session.set_value(kota_id, 'selectbox', options, rng.choice(options))
+        await session.rerun('filter_kota')
+
+
+async def pick_comparison(session, rng):
+    """Buka halaman perbandingan dan pilih 2-8 kota acak"""
+    await open_page(session, "Perbandingan Data")
+    multiselect_id, options = session.find('multiselect', key='kota_perbandingan')
+    session.set_value(multiselect_id, 'multiselect', options,
+                      rng.sample(options, min(len(options), rng.randint(2, 8))))
+    await session.rerun('perbandingan')
+
+
+# (aksi, bobot): kebanyakan pengguna mengganti filter, sebagian pindah menu atau membandingkan
+ACTIONS = [(switch_menu, 3), (change_filter, 5), (pick_comparison, 2)]
+
+
+async def drive(session, rng, deadline):
+    """Aksi acak berulang sampai deadline; sesi yang gagal dibuka ulang"""
+    actions, weights = zip(*ACTIONS)
+    while time.monotonic() < deadline:
+        try:
+            if session.ws is None:
+                await session.connect()
+            await rng.choices(actions, weights)[0](session, rng)
+        except WidgetNotFound:
+            # Dihitung gagal tanpa latency (mis. halaman error sebelum widget dirender)
+            session.samples.append(('widget', 0.0, False))
+            session.close()
+        except RerunFailed:
+            session.close()
+
+
+def server_stats(stats_url, since=None):
+    """Statistik proses server dari endpoint /stats, None jika tidak tersedia"""
+    if not stats_url:
+        return None
+    query = f"?since={since}" if since is not None else ''
+    try:
+        with urlopen(f"{stats_url.rstrip('/')}/stats{query}", timeout=30) as response:
+            return json.loads(response.read())
+    except OSError as e:
+        print(f"Statistik server tidak tersedia: {e}")
+        return None
+
+
+def start_server(port, stats_port, snapshot=None, max_events=200000, timeout=120):
+    """Menjalankan satu server Streamlit lewat warmup.py, return (proses, url, stats_url)"""
+    env = dict(os.environ, POLUSI_STATS_PORT=str(stats_port), POLUSI_MAX_EVENTS=str(max_events))
+    if snapshot:
+        env.update(POLUSI_READ_BACKEND='snapshot', POLUSI_SNAPSHOT_DIR=snapshot)
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'warmup.py')
+    process = subprocess.Popen([sys.executable, script, '--server.port', str(port),
+                                '--server.address', '127.0.0.1', '--server.headless', 'true',
+                                '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false'],
+                               env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urlopen(f"{url}/_stcore/health", timeout=2) as response:
+                if response.status == 200:
+                    return process, url, f"http://127.0.0.1:{stats_port}"
+        except OSError:
+            pass
+        if process.poll() is not None or time.monotonic() > deadline:
+            stop_server(process)
+            raise RuntimeError(f"Server Streamlit tidak siap di {url}")
+        time.sleep(0.5)
+
+
+def stop_server(process):
+    """Menghentikan server yang dijalankan start_server"""
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def _run_sessions(url, stats_url, n_sessions, duration, timeout, seed):
+    """Load awal semua sesi, lalu fase terukur bersamaan
+
+    Return (sampel per sesi, latency load awal, statistik server per fase, error load awal).
+    """
+    samples = [[] for _ in range(n_sessions)]
+    sessions = [BrowserSession(url, timeout, samples[i]) for i in range(n_sessions)]
+    stats = {'before': server_stats(stats_url)}
+    loads = await asyncio.gather(*(s.connect() for s in sessions), return_exceptions=True)
+    stats['loaded'] = server_stats(stats_url)
+    startup = [s[-1][1] for s, load in zip(samples, loads) if s and load is None]
+    for s, load in zip(sessions, loads):
+        s.samples.clear()
+        if load is not None:
+            s.close()
+
+    # Fase terukur dimulai bersamaan di semua sesi
+    since = time.time()
+    stats['start'] = server_stats(stats_url)
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*(drive(s, random.Random(seed * 1000 + i), deadline) for i, s in enumerate(sessions)))
+    stats['end'] = server_stats(stats_url, since)
+    for s in sessions:
+        s.close()
+    return samples, startup, stats, [repr(load) for load in loads if load is not None]
+
+
+def run_level(n_sessions, duration, timeout=120, seed=42, snapshot=None, max_events=200000, url=None,
+              stats_url=None, port=8601, stats_port=8603):
+    """Menjalankan n_sessions sesi bersamaan terhadap satu server selama duration detik, return ringkasan
+
+    Tanpa url, server baru dijalankan untuk tingkat ini (cache dingin, hasil antar tingkat
+    sebanding) dan dihentikan sesudahnya. Metrik server (query, cache, pool, memori) hanya
+    tersedia jika endpoint /stats bisa dibaca.
+    """
+    process = None
+    if url is None:
+        process, url, stats_url = start_server(port, stats_port, snapshot, max_events, timeout)
+    try:
+        samples, startup, stats, load_errors = asyncio.run(
+            _run_sessions(url, stats_url, n_sessions, duration, timeout, seed))
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    samples = [sample for session in samples for sample in session]
+    attempted = [ms for action, ms, ok in samples if action != 'widget']
+    latencies = sorted(ms for action, ms, ok in samples if ok)
+    failed = sum(1 for _, _, ok in samples if not ok)
+    by_action = {}
+    for action, ms, ok in samples:
+        if ok:
+            by_action.setdefault(action, []).append(ms)
+
+    start, end = stats['start'], stats['end']
+    server = start is not None and end is not None
+
+    def per_rerun(value, digits=2):
+        return round(value / len(attempted), digits) if attempted and value is not None else None
+
+    def pool_delta(key):
+        return end['pool'][key] - start['pool'][key] if server else None
+
+    mem_per_session = None
+    if stats['before'] is not None and stats['loaded'] is not None:
+        mem_per_session = round((stats['loaded']['rss_mb'] - stats['before']['rss_mb']) / n_sessions, 2)
+
+    return {
+        'sessions': n_sessions,
+        'sessions_failed_load': len(load_errors),
+        'reruns': len(latencies),
+        'errors': failed,
+        # Rerun gagal tidak ikut latency dan throughput, hanya error rate
+        'error_rate': round(failed / len(samples), 4) if samples else None,
+        'throughput_rps': round(len(latencies) / duration, 2) if duration else None,
+        'p50_ms': round(_percentile(latencies, 0.5), 1),
+        'p95_ms': round(_percentile(latencies, 0.95), 1),
+        'p99_ms': round(_percentile(latencies, 0.99), 1),
+        'max_ms': round(latencies[-1], 1) if latencies else 0.0,
+        'p95_ms_by_action': {action: round(_percentile(sorted(values), 0.95), 1)
+                             for action, values in sorted(by_action.items())},
+        'startup_ms': round(sum(startup) / len(startup), 1) if startup else None,
+        'db_queries_per_rerun': per_rerun(end['db_queries'] if server else None),
+        'cache_hits_per_rerun': per_rerun(end['cache_hits'] if server else None),
+        'query_ms_per_rerun': per_rerun(end['query_ms'] if server else None, 1),
+        'render_ms_per_rerun': per_rerun(end['render_ms'] if server else None, 1),
+        # Pool dan cache dibagi semua sesi di proses server: wait/timeout = kontensi koneksi MySQL
+        'pool_size': end['pool']['size'] if server else None,
+        'pool_checkouts': pool_delta('checkouts'),
+        'pool_waits': pool_delta('waits'),
+        'pool_timeouts': pool_delta('timeouts'),
+        'cache_hit_ratio': end['cache']['hit_ratio'] if server else None,
+        'figure_cache_hit_ratio': end['figure_cache']['hit_ratio'] if server else None,
+        'mem_per_session_mb': mem_per_session,
+        'server_rss_mb': end['rss_mb'] if server else None,
+        # Ring buffer diagnostik server penuh: metrik per rerun hanya dari event terakhir
+        'events_truncated': end['events_truncated'] if server else None,
+        'load_errors': load_errors
+    }
+
+
+def print_level(level):
+    print(f"{level['sessions']:>5} sesi  {level['throughput_rps']:>7} rerun/s  "
+          f"p50 {level['p50_ms']:>8} ms  p95 {level['p95_ms']:>8} ms  p99 {level['p99_ms']:>8} ms  "
+          f"query/rerun {level['db_queries_per_rerun']}  query {level['query_ms_per_rerun']} ms  "
+          f"render {level['render_ms_per_rerun']} ms  pool wait {level['pool_waits']} "
+          f"timeout {level['pool_timeouts']} (size {level['pool_size']})  "
+          f"mem/sesi {level['mem_per_session_mb']} MB  error rate {level['error_rate']}  "
+          f"load gagal {level['sessions_failed_load']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test sesi Streamlit bersamaan untuk main.py")
+    parser.add_argument('--sessions', default='1,5,10', help="daftar jumlah sesi bersamaan, dipisah koma")
+    parser.add_argument('--duration', type=float, default=30.0, help="durasi per tingkat (detik)")
+    parser.add_argument('--snapshot', default=None, help="jalankan terhadap direktori snapshot, bukan MySQL")
+    parser.add_argument('--timeout', type=float, default=120.0, help="timeout satu rerun (detik)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-events', type=int, default=200000, help="kapasitas ring buffer diagnostik server")
+    parser.add_argument('--url', default=None, help="server Streamlit yang sudah berjalan (default: jalankan sendiri)")
+    parser.add_argument('--stats-url', default=None, help="endpoint /stats server untuk --url (POLUSI_STATS_PORT)")
+    parser.add_argument('--port', type=int, default=8601, help="port server yang dijalankan load test")
+    parser.add_argument('--stats-port', type=int, default=8603)
+    parser.add_argument('--output', default=None, help="simpan hasil sebagai JSON")
+    args = parser.parse_args(argv)
+
+    if args.snapshot:
+        DatabaseConfig.READ_BACKEND = 'snapshot'
+        DatabaseConfig.SNAPSHOT_DIR = args.snapshot
+
+    levels = []
+    for n_sessions in [int(n) for n in args.sessions.split(',') if n.strip()]:
+        level = run_level(n_sessions, args.duration, args.timeout, args.seed, args.snapshot, args.max_events,
+                          args.url, args.stats_url, args.port, args.stats_port)
+        print_level(level)
+        levels.append(level)
+
+    if args.output:
+        output = {
+            'meta': {
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'backend': DatabaseConfig.READ_BACKEND,
+                'data_version': DatabaseConfig.get_data_version(),
+                'duration_s': args.duration,
+                'server': args.url or 'warmup.py (per tingkat)'
+            },
+            'levels': levels
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2)
+        print(f"Hasil disimpan ke {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,21 @@
+import time
+# Diukur sebelum import lain agar waktu import modul ikut tercatat saat cold start
+rerun_start = time.perf_counter()
+import os
+import tempfile
+from urllib.parse import urlencode
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import charts
+import diagnostics
+import dimensions
+import similarity
+import warmup
+from charts import px, go
 from config import DatabaseConfig
 
+import_ms = (time.perf_counter() - rerun_start) * 1000
+
 # Konfigurasi halaman
 st.set_page_config(
     page_title="Visualisasi Data Polusi & Kualitas Hidup",
@@ -20,134 +32,268 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Batas jumlah kota pada halaman Perbandingan Data
+MAX_KOTA_PERBANDINGAN = 8
+
+# Pilihan jumlah baris per halaman tabel Data Detail
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Export CSV besar di-stream oleh api.py (python api.py); unduhan langsung dari dashboard
+# dimuat Streamlit ke memori, jadi hanya diizinkan sampai EXPORT_MAX_ROWS baris
+EXPORT_API_URL = os.environ.get('POLUSI_API_URL', 'http://127.0.0.1:8502')
+EXPORT_MAX_ROWS = 100000
+
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
 
+@diagnostics.timed()
 def render_filter(key_prefix):
     """Render filter negara dan kota"""
+    index = dimensions.get_index()
     col1, col2 = st.columns(2)
     
     with col1:
-        negara_list = DatabaseConfig.get_negara_list()
-        negara_options = ['Semua Negara'] + negara_list['nama_negara'].tolist()
+        negara_options = ['Semua Negara'] + index.negara_names
         selected_negara = st.selectbox("Pilih Negara", negara_options, key=f"{key_prefix}_negara")
     
     with col2:
         if selected_negara != 'Semua Negara':
-            kode_negara = negara_list[negara_list['nama_negara'] == selected_negara]['kode_negara'].values[0]
-            kota_list = DatabaseConfig.get_kota_by_negara(kode_negara)
-            kota_options = ['Semua Kota'] + kota_list['nama_kota'].tolist()
+            kota_options = ['Semua Kota'] + index.kota_names(index.kode_by_nama[selected_negara])
             selected_kota = st.selectbox("Pilih Kota", kota_options, key=f"{key_prefix}_kota")
         else:
             selected_kota = 'Semua Kota'
-            kota_list = None
             st.selectbox("Pilih Kota", ['Semua Kota'], disabled=True, key=f"{key_prefix}_kota_disabled")
     
-    return selected_negara, selected_kota, negara_list, kota_list
+    return selected_negara, selected_kota, index
+
+def resolve_filters(selected_negara, selected_kota, index):
+    """Ubah pilihan filter menjadi argumen filter DatabaseConfig"""
+    if selected_negara == 'Semua Negara':
+        return {}
+    kode_negara = index.kode_by_nama[selected_negara]
+    if selected_kota != 'Semua Kota':
+        return {'id_kota': index.id_kota(kode_negara, selected_kota)}
+    return {'kode_negara': kode_negara}
 
-def get_filtered_data(selected_negara, selected_kota, negara_list, kota_list, data_type='polusi'):
-    """Ambil data berdasarkan filter"""
+def get_filtered_data(filters, data_type='polusi', columns=None):
+    """Ambil data berdasarkan filter (difilter di sisi database)"""
     get_data_func = DatabaseConfig.get_polusi_data if data_type == 'polusi' else DatabaseConfig.get_kualitas_hidup_data
-    
-    if selected_negara != 'Semua Negara' and selected_kota != 'Semua Kota':
-        id_kota = kota_list[kota_list['nama_kota'] == selected_kota]['id_kota'].values[0]
-        return get_data_func(id_kota=id_kota)
-    elif selected_negara != 'Semua Negara':
-        kode_negara = negara_list[negara_list['nama_negara'] == selected_negara]['kode_negara'].values[0]
-        all_kota = DatabaseConfig.get_kota_by_negara(kode_negara)
-        kota_ids = all_kota['id_kota'].tolist()
-        df = get_data_func()
-        return df[df['id_kota'].isin(kota_ids)]
-    else:
-        return get_data_func()
+    return get_data_func(columns=columns, **filters)
+
+def render_figure(chart, key, build):
+    """Render figure Plotly lewat cache figure bersama semua sesi
+
+    Key lengkap adalah versi data, halaman, jenis chart dan key (filter/pilihan), sehingga
+    build() hanya dipanggil jika figure dengan masukan yang sama belum pernah dibangun.
+    """
+    full_key = (DatabaseConfig.get_data_version(), diagnostics.current_page.get(), chart, *key)
+    st.plotly_chart(charts.cached_figure(chart, full_key, build), use_container_width=True)
 
-def render_metrics(df, metrics_config):
-    """Render metrics secara dinamis"""
-    latest_data = df[df['tahun'] == df['tahun'].max()]
+@diagnostics.timed()
+def render_metrics(latest_data, metrics_config):
+    """Render metrics secara dinamis dari data tahun terbaru"""
     cols = st.columns(len(metrics_config))
     for i, (col_name, label) in enumerate(metrics_config.items()):
         with cols[i]:
             st.metric(label, f"{latest_data[col_name].mean():.1f}")
 
-def render_trend_chart(df, y_col, title, selected_kota, color):
-    """Render chart trend"""
-    if selected_kota != 'Semua Kota':
-        fig = px.line(df, x='tahun', y=y_col, title=f'{title} - {selected_kota}', 
-                     labels={'tahun': 'Tahun', y_col: title}, markers=True)
-        fig.update_traces(line_color=color)
-    else:
-        fig = px.line(df, x='tahun', y=y_col, color='nama_kota', title=f'{title} per Kota',
-                     labels={'tahun': 'Tahun', y_col: title}, markers=True, 
+@diagnostics.timed()
+def render_trend_chart(df, y_col, title, selected_kota, color, filters):
+    """Render chart trend; banyak kota diringkas menjadi top-K garis dan band persentil"""
+    def build():
+        labels = {'tahun': 'Tahun', y_col: title}
+        if selected_kota != 'Semua Kota':
+            plot_df = charts.downsample(df, 'tahun', y_col)
+            fig = px.line(plot_df, x='tahun', y=y_col, title=f'{title} - {selected_kota}', labels=labels,
+                         markers=True, render_mode='webgl' if charts.use_webgl(len(plot_df)) else 'auto')
+            fig.update_traces(line_color=color)
+        elif df['nama_kota'].nunique() <= charts.MAX_TRACES:
+            plot_df = charts.downsample(df, 'tahun', y_col, group_col='nama_kota')
+            fig = px.line(plot_df, x='tahun', y=y_col, color='nama_kota', title=f'{title} per Kota',
+                         labels=labels, markers=True, color_discrete_sequence=DatabaseConfig.COLOR_PALETTE,
+                         render_mode='webgl' if charts.use_webgl(len(plot_df)) else 'auto')
+        else:
+            top_df, others_df = charts.split_top_k(df, y_col)
+            top_df = charts.downsample(top_df, 'tahun', y_col, group_col='nama_kota')
+            scatter = go.Scattergl if charts.use_webgl(len(top_df)) else go.Scatter
+            fig = go.Figure()
+            if not others_df.empty:
+                band = charts.downsample(charts.percentile_band(others_df, y_col), 'tahun', ['p10', 'p50', 'p90'])
+                n_others = others_df['nama_kota'].nunique()
+                fig.add_trace(go.Scatter(x=band['tahun'], y=band['p90'], mode='lines', line=dict(width=0),
+                                         showlegend=False, hoverinfo='skip'))
+                fig.add_trace(go.Scatter(x=band['tahun'], y=band['p10'], mode='lines', line=dict(width=0),
+                                         fill='tonexty', fillcolor='rgba(150, 150, 150, 0.25)',
+                                         name=f'P10-P90 {n_others} kota lainnya'))
+                fig.add_trace(go.Scatter(x=band['tahun'], y=band['p50'], mode='lines',
+                                         line=dict(color='gray', dash='dash'), name='Median kota lainnya'))
+            for i, (nama_kota, group) in enumerate(top_df.groupby('nama_kota', observed=True, sort=False)):
+                color_i = DatabaseConfig.COLOR_PALETTE[i % len(DatabaseConfig.COLOR_PALETTE)]
+                fig.add_trace(scatter(x=group['tahun'], y=group[y_col], mode='lines+markers', name=str(nama_kota),
+                                      line=dict(color=color_i)))
+            fig.update_layout(title=f'{title}: {charts.MAX_TRACES} Kota Tertinggi', xaxis_title='Tahun',
+                              yaxis_title=title)
+        fig.update_layout(height=500)
+        return fig
+
+    render_figure('trend', (y_col, title, selected_kota, tuple(sorted(filters.items()))), build)
+
+@diagnostics.timed()
+def render_rollup_trend(data_type, y_col, title, key):
+    """Render trend rata-rata per benua (drill-down ke negara) dari rollup; False jika rollup kosong"""
+    df = DatabaseConfig.get_drilldown(data_type, y_col)
+    if df.empty:
+        return False
+    benua_options = ['Semua Benua'] + sorted(df['benua'].astype(str).unique())
+    benua = st.selectbox("Rincian per negara untuk benua", benua_options, key=f"{key}_benua")
+    group_col = 'benua'
+    top_only = False
+    if benua != 'Semua Benua':
+        df = DatabaseConfig.get_drilldown(data_type, y_col, benua=benua)
+        group_col = 'nama_negara'
+        top_only = df[group_col].nunique() > charts.MAX_TRACES
+        if top_only:
+            st.caption(f"Menampilkan {charts.MAX_TRACES} negara dengan rata-rata tertinggi")
+
+    def build():
+        plot_df = charts.split_top_k(df, 'rata_rata', group_col=group_col)[0] if top_only else df
+        fig = px.line(plot_df, x='tahun', y='rata_rata', color=group_col, markers=True,
+                     hover_data=['p25', 'p50', 'p75', 'minimum', 'maksimum', 'jumlah'],
+                     title=f'{title} per {"Benua" if group_col == "benua" else f"Negara ({benua})"}',
+                     labels={'tahun': 'Tahun', 'rata_rata': f'Rata-rata {title}', 'nama_negara': 'Negara',
+                             'benua': 'Benua'},
                      color_discrete_sequence=DatabaseConfig.COLOR_PALETTE)
-    fig.update_layout(height=500)
-    st.plotly_chart(fig, use_container_width=True)
+        fig.update_layout(height=500)
+        return fig
+
+    # rollup_indikator diisi refresh_rollup terpisah dari tabel fakta, versinya ikut masuk key
+    rollup_version = DatabaseConfig.get_data_version('rollup_indikator')
+    render_figure('rollup_trend', (data_type, y_col, title, benua, rollup_version), build)
+    return True
 
-def render_comparison_bar(df, indicators, labels_map, title):
+@diagnostics.timed()
+def render_comparison_bar(df, indicators, labels_map, title, filters):
     """Render grouped bar chart untuk perbandingan indikator"""
-    fig = go.Figure()
-    for indicator in indicators:
-        fig.add_trace(go.Bar(
-            name=labels_map.get(indicator, indicator).upper(),
-            x=df['nama_kota'], y=df[indicator]
-        ))
-    fig.update_layout(title=title, xaxis_title='Kota', yaxis_title='Nilai Index', 
-                     barmode='group', height=500)
-    st.plotly_chart(fig, use_container_width=True)
-
-def render_horizontal_bar(df, x_col, title, color_scale):
-    """Render horizontal bar chart"""
-    df_sorted = df.sort_values(x_col, ascending=True)
-    fig = px.bar(df_sorted, y='nama_kota', x=x_col, orientation='h', title=title,
-               labels={'nama_kota': 'Kota', x_col: title.split('per')[0].strip()},
-               color=x_col, color_continuous_scale=color_scale)
-    fig.update_layout(height=max(400, len(df_sorted) * 30))
-    st.plotly_chart(fig, use_container_width=True)
-
-def render_data_table(df, available_columns, default_cols, key):
-    """Render tabel data dengan pemilihan kolom"""
+    def build():
+        fig = go.Figure()
+        for indicator in indicators:
+            fig.add_trace(go.Bar(
+                name=labels_map.get(indicator, indicator).upper(),
+                x=df['nama_kota'], y=df[indicator]
+            ))
+        fig.update_layout(title=title, xaxis_title='Kota', yaxis_title='Nilai Index', 
+                         barmode='group', height=500)
+        return fig
+
+    render_figure('comparison_bar', (title, tuple(indicators), tuple(sorted(filters.items()))), build)
+
+@diagnostics.timed()
+def render_horizontal_bar(df, x_col, title, color_scale, filters):
+    """Render horizontal bar chart, dibatasi ke kota dengan nilai tertinggi dan terendah"""
+    if len(df) > charts.MAX_BAR_ROWS:
+        half = charts.MAX_BAR_ROWS // 2
+        st.caption(f"Menampilkan {half} kota tertinggi dan {half} terendah dari {len(df)} kota")
+
+    def build():
+        df_sorted = charts.cap_bar_rows(df, x_col)
+        fig = px.bar(df_sorted, y='nama_kota', x=x_col, orientation='h', title=title,
+                   labels={'nama_kota': 'Kota', x_col: title.split('per')[0].strip()},
+                   color=x_col, color_continuous_scale=color_scale)
+        fig.update_layout(height=max(400, len(df_sorted) * charts.BAR_ROW_HEIGHT))
+        return fig
+
+    render_figure('horizontal_bar', (x_col, title, tuple(sorted(filters.items()))), build)
+
+@diagnostics.timed()
+def render_data_table(data_type, filters, available_columns, default_cols, key):
+    """Render tabel data dengan pemilihan kolom, dipaginasi di sisi database"""
     st.markdown("---")
     st.subheader("Data Detail")
     selected_columns = st.multiselect("Pilih kolom yang ingin ditampilkan:",
         options=list(available_columns.keys()), default=default_cols,
         format_func=lambda x: available_columns[x], key=key)
     
-    if selected_columns:
-        display_df = df[selected_columns].sort_values('tahun', ascending=False) if 'tahun' in selected_columns else df[selected_columns]
-        st.dataframe(display_df, use_container_width=True, hide_index=True)
-        st.caption(f"Menampilkan {len(display_df)} baris data")
-    else:
+    if not selected_columns:
         st.warning("Pilih minimal satu kolom untuk ditampilkan")
+        return
+    
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Baris per halaman", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    
+    # Posisi keyset (tahun, id_kota) tiap halaman yang sudah dibuka, direset saat filter berubah
+    signature = (data_type, tuple(sorted(filters.items())), page_size)
+    if st.session_state.get(f"{key}_signature") != signature:
+        st.session_state[f"{key}_signature"] = signature
+        st.session_state[f"{key}_cursors"] = [None]
+        st.session_state[f"{key}_page"] = 0
+    cursors = st.session_state[f"{key}_cursors"]
+    page = st.session_state[f"{key}_page"]
+    
+    total = DatabaseConfig.count_fact_rows(data_type, **filters)
+    total_pages = max(1, -(-total // page_size))
+    page_df = DatabaseConfig.get_fact_page(data_type, selected_columns, cursors[page], page_size, **filters)
+    # Query gagal menghasilkan DataFrame tanpa kolom: jangan membaca cursor atau memotong kolom
+    if page_df.empty or not set(selected_columns + ['tahun', 'id_kota']).issubset(page_df.columns):
+        st.warning("Data detail tidak tersedia untuk filter ini atau database sedang bermasalah")
+        return
+    if len(page_df) == page_size and len(cursors) == page + 1 and page + 1 < total_pages:
+        cursors.append((int(page_df['tahun'].iloc[-1]), int(page_df['id_kota'].iloc[-1])))
+    
+    def go_to(target):
+        st.session_state[f"{key}_page"] = target
+    
+    with col2:
+        st.button("Sebelumnya", disabled=page == 0, on_click=go_to, args=(page - 1,), key=f"{key}_prev")
+    with col3:
+        st.button("Berikutnya", disabled=len(cursors) <= page + 1, on_click=go_to, args=(page + 1,),
+                  key=f"{key}_next")
+    
+    st.dataframe(page_df[selected_columns], use_container_width=True, hide_index=True)
+    st.caption(f"Halaman {page + 1} dari {total_pages} | menampilkan {len(page_df)} dari {total} baris data")
+    
+    with col4:
+        export_query = urlencode({**filters, 'columns': ','.join(selected_columns)})
+        st.link_button("Unduh CSV (stream)", f"{EXPORT_API_URL}/export/{data_type}?{export_query}")
+        if total > EXPORT_MAX_ROWS:
+            st.caption(f"Lebih dari {EXPORT_MAX_ROWS} baris: unduh lewat API export (python api.py)")
+        elif st.button("Siapkan CSV", key=f"{key}_csv"):
+            # Ditulis per chunk dari cursor database ke file sementara, bukan dari DataFrame penuh
+            with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8',
+                                             delete=False) as csv_tmp:
+                DatabaseConfig.export_fact_csv(csv_tmp, data_type, selected_columns, **filters)
+            try:
+                with open(csv_tmp.name, 'rb') as csv_file:
+                    st.download_button("Unduh CSV", csv_file, file_name=f"data_{data_type}.csv",
+                                       mime='text/csv', key=f"{key}_download")
+            finally:
+                os.remove(csv_tmp.name)
 
-def render_comparison_metrics(data, metrics_list, col_name):
-    """Render metrics untuk perbandingan 2 kota"""
+@diagnostics.timed()
+def render_comparison_metrics(data, metrics_list):
+    """Render metrics satu kota pada halaman perbandingan"""
     st.markdown(f"#### {data['nama_kota']}")
     for metric, label in metrics_list:
         st.metric(label, f"{data[metric]:.1f}")
 
-def render_comparison_tab(df1, df2, data_type='polusi'):
-    """Render tab perbandingan (polusi atau kualitas hidup)"""
-    if df1.empty or df2.empty:
-        st.warning(f"Data {data_type} tidak lengkap untuk perbandingan")
-        return
-    
-    common_years = set(df1['tahun'].tolist()) & set(df2['tahun'].tolist())
-    if not common_years:
-        st.warning("Tidak ada data tahun yang sama untuk kedua kota")
+@diagnostics.timed()
+def render_comparison_tab(df, kota_ids, data_type='polusi'):
+    """Render tab perbandingan N kota (polusi atau kualitas hidup)
+
+    df berisi data semua kota (kota_ids) yang sudah diselaraskan pada tahun yang sama.
+    """
+    if df.empty:
+        st.warning("Tidak ada data tahun yang sama untuk semua kota")
         return
     
-    latest_year = max(common_years)
-    d1 = df1[df1['tahun'] == latest_year].iloc[0]
-    d2 = df2[df2['tahun'] == latest_year].iloc[0]
-    
-    # Metrics
-    col1, col2 = st.columns(2)
+    latest_year = df['tahun'].max()
+    rows = [row for _, row in df[df['tahun'] == latest_year].iterrows()]
     
     if data_type == 'polusi':
         metrics = [('index_kualitas_udara', 'Index Kualitas Udara'), ('pm25', 'PM2.5'), 
                   ('index_co2', 'CO2'), ('index_no2', 'NO2')]
-        chart_data = [d1['index_kualitas_udara'], d1['pm25'], d1['index_co2'], d1['index_no2']]
-        chart_data2 = [d2['index_kualitas_udara'], d2['pm25'], d2['index_co2'], d2['index_no2']]
+        chart_cols = ['index_kualitas_udara', 'pm25', 'index_co2', 'index_no2']
         chart_labels = ['Index Polusi', 'PM2.5', 'CO2', 'NO2']
         y_col = 'index_kualitas_udara'
     else:
@@ -157,45 +303,78 @@ def render_comparison_tab(df1, df2, data_type='polusi'):
         indicators = ['index_keamanan', 'index_kesehatan', 'index_pendidikan', 'index_biaya_hidup']
         y_col = 'index_kualitas_hidup'
     
-    with col1:
-        render_comparison_metrics(d1, metrics, 'col1')
-    
-    with col2:
-        render_comparison_metrics(d2, metrics, 'col2')
-        # Add delta untuk col2
-        for i, (metric, label) in enumerate(metrics):
-            delta = d2[metric] - d1[metric]
+    # Metrics
+    for col, row in zip(st.columns(len(rows)), rows):
+        with col:
+            render_comparison_metrics(row, metrics)
     
     st.markdown("---")
     
     # Chart perbandingan
-    if data_type == 'polusi':
-        fig = go.Figure(data=[
-            go.Bar(name=d1['nama_kota'], x=chart_labels, y=chart_data),
-            go.Bar(name=d2['nama_kota'], x=chart_labels, y=chart_data2)
-        ])
-        fig.update_layout(title=f'Perbandingan Indikator Polusi ({latest_year})', 
-                         barmode='group', height=400)
-    else:
-        # Radar chart untuk kualitas hidup
-        fig = go.Figure()
-        labels_radar = ['Keamanan', 'Kesehatan', 'Pendidikan', 'Biaya Hidup']
-        fig.add_trace(go.Scatterpolar(r=[d1[ind] for ind in indicators], theta=labels_radar,
-                                     fill='toself', name=d1['nama_kota']))
-        fig.add_trace(go.Scatterpolar(r=[d2[ind] for ind in indicators], theta=labels_radar,
-                                     fill='toself', name=d2['nama_kota']))
-        fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
-                        title=f'Perbandingan Indikator Kualitas Hidup ({latest_year})', height=500)
+    def build_indicators():
+        if data_type == 'polusi':
+            fig = go.Figure(data=[go.Bar(name=row['nama_kota'], x=chart_labels, y=[row[c] for c in chart_cols])
+                                  for row in rows])
+            fig.update_layout(title=f'Perbandingan Indikator Polusi ({latest_year})', 
+                             barmode='group', height=400)
+        else:
+            # Radar chart untuk kualitas hidup
+            fig = go.Figure()
+            labels_radar = ['Keamanan', 'Kesehatan', 'Pendidikan', 'Biaya Hidup']
+            for row in rows:
+                fig.add_trace(go.Scatterpolar(r=[row[ind] for ind in indicators], theta=labels_radar,
+                                             fill='toself', name=row['nama_kota']))
+            fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
+                            title=f'Perbandingan Indikator Kualitas Hidup ({latest_year})', height=500)
+        return fig
     
-    st.plotly_chart(fig, use_container_width=True)
+    render_figure('comparison_indikator', (data_type, tuple(kota_ids)), build_indicators)
     
     # Trend comparison
     st.markdown(f"#### Trend {data_type.title()} dari Waktu ke Waktu")
-    combined = pd.concat([df1.assign(kota=d1['nama_kota']), df2.assign(kota=d2['nama_kota'])])
-    fig = px.line(combined, x='tahun', y=y_col, color='kota', markers=True,
-                labels={'tahun': 'Tahun', y_col: y_col.replace('_', ' ').title()})
-    fig.update_layout(height=400)
-    st.plotly_chart(fig, use_container_width=True)
+    
+    def build_trend():
+        fig = px.line(df, x='tahun', y=y_col, color='nama_kota', markers=True,
+                    labels={'tahun': 'Tahun', y_col: y_col.replace('_', ' ').title(), 'nama_kota': 'kota'})
+        fig.update_layout(height=400)
+        return fig
+    
+    render_figure('comparison_trend', (data_type, tuple(kota_ids)), build_trend)
+
+@st.cache_resource(show_spinner=False)
+def record_startup(_import_ms):
+    """Mencatat waktu import sekali per proses server
+
+    Pre-warm dijalankan launcher (python warmup.py) sebelum request pertama; jika server
+    dijalankan langsung dengan streamlit run, pre-warm dimulai di latar tanpa menahan rerun ini.
+    """
+    diagnostics.record('startup', 'import', _import_ms)
+    warmup.start()
+    return time.time()
+
+@diagnostics.timed()
+def render_similar_cities(index, default_label=None):
+    """Render pencarian K kota paling mirip berdasarkan indikator polusi dan kualitas hidup"""
+    st.markdown("---")
+    st.markdown("### Cari Kota Serupa")
+    tahun_list = DatabaseConfig.get_tahun_list()
+    if tahun_list.empty:
+        st.info("Data tahun tidak tersedia")
+        return
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        default = index.labels.index(default_label) if default_label in index.id_by_label else 0
+        label = st.selectbox("Kota acuan", index.labels, index=default, key='kota_serupa')
+    with col2:
+        tahun = st.selectbox("Tahun", tahun_list['tahun'].tolist(), key='tahun_serupa')
+    with col3:
+        k = st.number_input("Jumlah kota", min_value=1, max_value=50, value=10, key='k_serupa')
+    similar = similarity.find_similar(index.id_by_label[label], tahun, int(k))
+    if similar.empty:
+        st.warning("Kota acuan tidak memiliki data polusi dan kualitas hidup lengkap pada tahun tersebut")
+        return
+    st.dataframe(similar.drop(columns='id_kota'), use_container_width=True, hide_index=True)
+    st.caption("Jarak Euclidean antar vektor indikator polusi dan kualitas hidup yang dinormalisasi (z-score)")
 
 # ============================================
 # SIDEBAR NAVIGATION
@@ -206,6 +385,14 @@ with st.sidebar:
     menu = st.radio("Menu Navigasi", ["Home", "Polusi Udara", "Kualitas Hidup", "Perbandingan Data"], 
                    label_visibility="collapsed")
 
+diagnostics.set_page(menu)
+
+# Time-to-first-paint: header dan sidebar sudah terkirim ke browser pada titik ini
+if 'first_paint_ms' not in st.session_state:
+    st.session_state['first_paint_ms'] = (time.perf_counter() - rerun_start) * 1000
+    diagnostics.record('startup', 'first_paint', st.session_state['first_paint_ms'])
+record_startup(import_ms)
+
 # ============================================
 # HALAMAN HOME
 # ============================================
@@ -213,7 +400,10 @@ if menu == "Home":
     st.title("Dashboard Polusi dan Kualitas Hidup Global")
     st.markdown("dashboard visualisasi data polusi dan kualitas hidup kota-kota di dunia")
     
-    stats = DatabaseConfig.get_summary_stats()
+    # Semua query halaman Home independen, jadi dijalankan paralel
+    home_data = DatabaseConfig.submit_queries(warmup.HOME_QUERIES)
+    
+    stats = home_data['stats'].result()
     
     if not stats.empty:
         st.markdown("### Ringkasan Data")
@@ -233,41 +423,48 @@ if menu == "Home":
     # Data Overview
     col1, col2 = st.columns(2)
     
-    for col, (title, df_func, y_col, scale, is_largest) in [
-        (col1, ("Data Polusi Terkini", DatabaseConfig.get_polusi_data, 'index_kualitas_udara', 'Reds', True)),
-        (col2, ("Data Kualitas Hidup Terkini", DatabaseConfig.get_kualitas_hidup_data, 'index_kualitas_hidup', 'Greens', True))
+    for col, (title, data_type, y_col, scale) in [
+        (col1, ("Data Polusi Terkini", 'polusi', 'index_kualitas_udara', 'Reds')),
+        (col2, ("Data Kualitas Hidup Terkini", 'kualitas', 'index_kualitas_hidup', 'Greens'))
     ]:
         with col:
             st.markdown(f"### {title}")
-            df = df_func()
-            if not df.empty:
-                latest_year = df['tahun'].max()
-                latest_df = df[df['tahun'] == latest_year].nlargest(5, y_col) if is_largest else df[df['tahun'] == latest_year].nsmallest(5, y_col)
+            latest_df = home_data[data_type].result()
+            if not latest_df.empty:
+                latest_year = latest_df['tahun'].iloc[0]
+                
+                def build_top5():
+                    fig = px.bar(latest_df, x='nama_kota', y=y_col,
+                               title=f'5 Kota {"Tertinggi" if "Polusi" in title else "Terbaik"} ({latest_year})',
+                               labels={'nama_kota': 'Kota', y_col: y_col.replace('_', ' ').title()},
+                               color=y_col, color_continuous_scale=scale)
+                    fig.update_layout(showlegend=False, height=400)
+                    return fig
                 
-                fig = px.bar(latest_df, x='nama_kota', y=y_col,
-                           title=f'5 Kota {"Tertinggi" if "Polusi" in title else "Terbaik"} ({latest_year})',
-                           labels={'nama_kota': 'Kota', y_col: y_col.replace('_', ' ').title()},
-                           color=y_col, color_continuous_scale=scale)
-                fig.update_layout(showlegend=False, height=400)
-                st.plotly_chart(fig, use_container_width=True)
+                render_figure('top5', (data_type,), build_top5)
             else:
                 st.warning(f"Data {title.lower()} tidak tersedia")
     
     # Distribusi per Benua
     st.markdown("---")
     st.markdown("### Distribusi Kota per Benua")
-    negara_df = DatabaseConfig.get_negara_list()
-    kota_df = DatabaseConfig.get_all_kota()
-    
-    if not negara_df.empty and not kota_df.empty:
-        kota_benua = kota_df.merge(negara_df[['kode_negara', 'benua']], on='kode_negara')
-        benua_count = kota_benua['benua'].value_counts().reset_index()
-        benua_count.columns = ['benua', 'jumlah_kota']
-        fig = px.pie(benua_count, values='jumlah_kota', names='benua',
-                    title='Distribusi Kota Berdasarkan Benua',
-                    color_discrete_sequence=DatabaseConfig.COLOR_PALETTE)
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        st.plotly_chart(fig, use_container_width=True)
+    index = home_data['dimensi'].result()
+    
+    if len(index):
+        def build_benua_pie():
+            benua_count = pd.DataFrame({
+                'benua': list(index.negara_by_benua),
+                'jumlah_kota': [sum(len(index.kota_names(kode)) for kode in kodes)
+                                for kodes in index.negara_by_benua.values()]
+            })
+            benua_count = benua_count[benua_count['jumlah_kota'] > 0]
+            fig = px.pie(benua_count, values='jumlah_kota', names='benua',
+                        title='Distribusi Kota Berdasarkan Benua',
+                        color_discrete_sequence=DatabaseConfig.COLOR_PALETTE)
+            fig.update_traces(textposition='inside', textinfo='percent+label')
+            return fig
+        
+        render_figure('benua_pie', (), build_benua_pie)
 
 # ============================================
 # HALAMAN POLUSI & KUALITAS HIDUP (GENERIC)
@@ -278,41 +475,50 @@ elif menu in ["Polusi Udara", "Kualitas Hidup"]:
     
     st.title(f"Analisis Data {menu}")
     
-    selected_negara, selected_kota, negara_list, kota_list = render_filter(data_type)
-    df = get_filtered_data(selected_negara, selected_kota, negara_list, kota_list, data_type)
+    # Metrics configuration
+    if is_polusi:
+        metrics_config = {'index_kualitas_udara': 'Rata-rata Index Polusi', 'pm25': 'Rata-rata PM2.5',
+                        'index_co2': 'Rata-rata CO2', 'index_no2': 'Rata-rata NO2'}
+        indicators = ['index_co2', 'index_ozone', 'index_no2', 'pm25']
+        labels_map = {'index_co2': 'CO2', 'index_ozone': 'Ozone', 'index_no2': 'NO2', 'pm25': 'PM2.5'}
+        main_col = 'index_kualitas_udara'
+        color = DatabaseConfig.COLORS['danger']
+        color_scale = 'Reds'
+        available_columns = {'nama_kota': 'Nama Kota', 'nama_negara': 'Nama Negara', 'tahun': 'Tahun',
+                           'index_kualitas_udara': 'Index Kualitas Udara', 'index_co2': 'Index CO2',
+                           'index_ozone': 'Index Ozone', 'index_no2': 'Index NO2', 'pm25': 'PM2.5'}
+        default_cols = ['nama_kota', 'nama_negara', 'tahun', 'index_kualitas_udara', 'pm25']
+    else:
+        metrics_config = {'index_kualitas_hidup': 'Index Kualitas', 'index_keamanan': 'Keamanan',
+                        'index_kesehatan': 'Kesehatan', 'index_pendidikan': 'Pendidikan',
+                        'index_biaya_hidup': 'Biaya Hidup'}
+        indicators = ['index_keamanan', 'index_kesehatan', 'index_pendidikan', 'index_biaya_hidup']
+        labels_map = {k: k.replace('index_', '').replace('_', ' ').title() for k in indicators}
+        main_col = 'index_kualitas_hidup'
+        color = DatabaseConfig.COLORS['success']
+        color_scale = 'Greens'
+        available_columns = {'nama_kota': 'Nama Kota', 'nama_negara': 'Nama Negara', 'tahun': 'Tahun',
+                           'index_kualitas_hidup': 'Index Kualitas Hidup', 'index_keamanan': 'Index Keamanan',
+                           'index_kesehatan': 'Index Kesehatan', 'index_pendidikan': 'Index Pendidikan',
+                           'index_biaya_hidup': 'Index Biaya Hidup'}
+        default_cols = ['nama_kota', 'nama_negara', 'tahun', 'index_kualitas_hidup', 'index_keamanan']
+    
+    # Hanya kolom yang dipakai halaman ini yang diambil dari database
+    latest_columns = list(dict.fromkeys(['id_kota', 'tahun', 'nama_kota', main_col] + list(metrics_config) +
+                                        indicators))
     
-    if not df.empty:
+    selected_negara, selected_kota, index = render_filter(data_type)
+    filters = resolve_filters(selected_negara, selected_kota, index)
+    # Baris terbaru tiap kota diambil di database (satu baris per kota, bukan seluruh riwayat)
+    latest_df = DatabaseConfig.get_latest_snapshot(data_type, columns=latest_columns, **filters)
+    
+    if not latest_df.empty:
         st.markdown("---")
         
-        # Metrics configuration
-        if is_polusi:
-            metrics_config = {'index_kualitas_udara': 'Rata-rata Index Polusi', 'pm25': 'Rata-rata PM2.5',
-                            'index_co2': 'Rata-rata CO2', 'index_no2': 'Rata-rata NO2'}
-            indicators = ['index_co2', 'index_ozone', 'index_no2', 'pm25']
-            labels_map = {'index_co2': 'CO2', 'index_ozone': 'Ozone', 'index_no2': 'NO2', 'pm25': 'PM2.5'}
-            main_col = 'index_kualitas_udara'
-            color = DatabaseConfig.COLORS['danger']
-            color_scale = 'Reds'
-            available_columns = {'nama_kota': 'Nama Kota', 'nama_negara': 'Nama Negara', 'tahun': 'Tahun',
-                               'index_kualitas_udara': 'Index Kualitas Udara', 'index_co2': 'Index CO2',
-                               'index_ozone': 'Index Ozone', 'index_no2': 'Index NO2', 'pm25': 'PM2.5'}
-            default_cols = ['nama_kota', 'nama_negara', 'tahun', 'index_kualitas_udara', 'pm25']
-        else:
-            metrics_config = {'index_kualitas_hidup': 'Index Kualitas', 'index_keamanan': 'Keamanan',
-                            'index_kesehatan': 'Kesehatan', 'index_pendidikan': 'Pendidikan',
-                            'index_biaya_hidup': 'Biaya Hidup'}
-            indicators = ['index_keamanan', 'index_kesehatan', 'index_pendidikan', 'index_biaya_hidup']
-            labels_map = {k: k.replace('index_', '').replace('_', ' ').title() for k in indicators}
-            main_col = 'index_kualitas_hidup'
-            color = DatabaseConfig.COLORS['success']
-            color_scale = 'Greens'
-            available_columns = {'nama_kota': 'Nama Kota', 'nama_negara': 'Nama Negara', 'tahun': 'Tahun',
-                               'index_kualitas_hidup': 'Index Kualitas Hidup', 'index_keamanan': 'Index Keamanan',
-                               'index_kesehatan': 'Index Kesehatan', 'index_pendidikan': 'Index Pendidikan',
-                               'index_biaya_hidup': 'Index Biaya Hidup'}
-            default_cols = ['nama_kota', 'nama_negara', 'tahun', 'index_kualitas_hidup', 'index_keamanan']
+        latest_year = int(latest_df['tahun'].max())
+        latest_df = latest_df[latest_df['tahun'] == latest_year]
         
-        render_metrics(df, metrics_config)
+        render_metrics(latest_df, metrics_config)
         st.markdown("---")
         
         # Visualisasi
@@ -320,28 +526,31 @@ elif menu in ["Polusi Udara", "Kualitas Hidup"]:
         
         with tab1:
             st.subheader(f"Trend {main_col.replace('_', ' ').title()}")
-            render_trend_chart(df, main_col, f'Trend {menu.split()[0]}', selected_kota, color)
+            # Semua negara: agregat per benua/negara dari rollup, bukan ribuan garis kota;
+            # riwayat baris fakta hanya diambil untuk drill-down negara/kota (atau jika rollup kosong)
+            if selected_negara != 'Semua Negara' or not render_rollup_trend(
+                    data_type, main_col, f'Trend {menu.split()[0]}', f"{data_type}_rollup"):
+                trend_df = get_filtered_data(filters, data_type, ['id_kota', 'tahun', 'nama_kota', main_col])
+                if not trend_df.empty:
+                    render_trend_chart(trend_df, main_col, f'Trend {menu.split()[0]}', selected_kota, color,
+                                       filters)
         
         with tab2:
             st.subheader(f"Perbandingan Indikator {menu.split()[0]}")
-            latest_year = df['tahun'].max()
-            latest_df = df[df['tahun'] == latest_year].copy()
-            if not latest_df.empty:
-                if len(latest_df) > 10:
-                    latest_df = latest_df.nlargest(10, main_col)
-                render_comparison_bar(latest_df, indicators, labels_map, 
-                                    f'Perbandingan Indikator {menu.split()[0]} ({latest_year})')
+            bar_df = DatabaseConfig.get_top_n(data_type, main_col, 10, tahun=latest_year, columns=indicators,
+                                              **filters)
+            if not bar_df.empty:
+                render_comparison_bar(bar_df, indicators, labels_map, 
+                                    f'Perbandingan Indikator {menu.split()[0]} ({latest_year})', filters)
         
         with tab3:
             st.subheader(f"Perbandingan {menu.split()[0]} Antar Kota")
-            latest_year = df['tahun'].max()
-            latest_df = df[df['tahun'] == latest_year].copy()
             if not latest_df.empty:
                 render_horizontal_bar(latest_df, main_col, 
                                     f'{main_col.replace("_", " ").title()} per Kota ({latest_year})',
-                                    color_scale)
+                                    color_scale, filters)
         
-        render_data_table(df, available_columns, default_cols, f"{data_type}_columns")
+        render_data_table(data_type, filters, available_columns, default_cols, f"{data_type}_columns")
     else:
         st.warning(f"Data {data_type} tidak tersedia untuk filter yang dipilih")
 
@@ -352,92 +561,85 @@ elif menu == "Perbandingan Data":
     st.title("Perbandingan Data Antar Kota")
     st.markdown("### Pilih Kota untuk Dibandingkan")
     
-    kota_all = DatabaseConfig.get_all_kota()
+    index = dimensions.get_index()
     
-    if not kota_all.empty:
-        kota_all['display_name'] = kota_all['nama_kota'] + ' (' + kota_all['nama_negara'] + ')'
+    if len(index):
+        kota_options = index.labels
         
-        col1, col2 = st.columns(2)
-        with col1:
-            kota1 = st.selectbox("Kota Pertama", options=kota_all['display_name'].tolist(), key='kota1')
-            id_kota1 = kota_all[kota_all['display_name'] == kota1]['id_kota'].values[0]
+        selected_kota = st.multiselect("Kota yang dibandingkan", options=kota_options,
+                                       default=kota_options[:2], max_selections=MAX_KOTA_PERBANDINGAN,
+                                       key='kota_perbandingan')
         
-        with col2:
-            kota2 = st.selectbox("Kota Kedua", options=kota_all['display_name'].tolist(),
-                               index=1 if len(kota_all) > 1 else 0, key='kota2')
-            id_kota2 = kota_all[kota_all['display_name'] == kota2]['id_kota'].values[0]
-        
-        if id_kota1 == id_kota2:
-            st.warning("Pilih dua kota yang berbeda untuk perbandingan")
+        if len(selected_kota) < 2:
+            st.warning("Pilih minimal dua kota yang berbeda untuk perbandingan")
         else:
             st.markdown("---")
             
-            # Ambil data
-            polusi1 = DatabaseConfig.get_polusi_data(id_kota=id_kota1)
-            polusi2 = DatabaseConfig.get_polusi_data(id_kota=id_kota2)
-            kualitas1 = DatabaseConfig.get_kualitas_hidup_data(id_kota=id_kota1)
-            kualitas2 = DatabaseConfig.get_kualitas_hidup_data(id_kota=id_kota2)
+            # Ambil data semua kota dalam satu query
+            id_kota_list = index.ids_for_labels(selected_kota)
+            comparison_df = DatabaseConfig.get_comparison_data(id_kota_list)
             
             tab1, tab2, tab3 = st.tabs(["Perbandingan Polusi", "Perbandingan Kualitas Hidup", "Overview"])
             
             with tab1:
                 st.subheader("Perbandingan Data Polusi")
-                render_comparison_tab(polusi1, polusi2, 'polusi')
+                render_comparison_tab(comparison_df, id_kota_list, 'polusi')
             
             with tab2:
                 st.subheader("Perbandingan Kualitas Hidup")
-                render_comparison_tab(kualitas1, kualitas2, 'kualitas')
+                render_comparison_tab(comparison_df, id_kota_list, 'kualitas')
             
             with tab3:
                 st.subheader("Overview Perbandingan")
                 try:
-                    if not any([polusi1.empty, polusi2.empty, kualitas1.empty, kualitas2.empty]):
-                        all_years = (set(polusi1['tahun'].tolist()) & set(polusi2['tahun'].tolist()) &
-                                    set(kualitas1['tahun'].tolist()) & set(kualitas2['tahun'].tolist()))
+                    if not comparison_df.empty:
+                        latest_year = comparison_df['tahun'].max()
+                        latest = comparison_df[comparison_df['tahun'] == latest_year].set_index('nama_kota')
                         
-                        if all_years:
-                            latest_year = max(all_years)
-                            p1, p2 = polusi1[polusi1['tahun'] == latest_year].iloc[0], polusi2[polusi2['tahun'] == latest_year].iloc[0]
-                            k1, k2 = kualitas1[kualitas1['tahun'] == latest_year].iloc[0], kualitas2[kualitas2['tahun'] == latest_year].iloc[0]
-                            
-                            comparison_data = {
-                                'Indikator': ['Index Polusi', 'PM2.5', 'CO2', 'Index Kualitas Hidup', 'Keamanan', 'Kesehatan', 'Pendidikan'],
-                                k1['nama_kota']: [f"{p1['index_kualitas_udara']:.1f}", f"{p1['pm25']:.1f}", f"{p1['index_co2']:.1f}",
-                                                f"{k1['index_kualitas_hidup']:.1f}", f"{k1['index_keamanan']:.1f}",
-                                                f"{k1['index_kesehatan']:.1f}", f"{k1['index_pendidikan']:.1f}"],
-                                k2['nama_kota']: [f"{p2['index_kualitas_udara']:.1f}", f"{p2['pm25']:.1f}", f"{p2['index_co2']:.1f}",
-                                                f"{k2['index_kualitas_hidup']:.1f}", f"{k2['index_keamanan']:.1f}",
-                                                f"{k2['index_kesehatan']:.1f}", f"{k2['index_pendidikan']:.1f}"],
-                                'Selisih': [f"{(p2['index_kualitas_udara'] - p1['index_kualitas_udara']):.1f}",
-                                          f"{(p2['pm25'] - p1['pm25']):.1f}", f"{(p2['index_co2'] - p1['index_co2']):.1f}",
-                                          f"{(k2['index_kualitas_hidup'] - k1['index_kualitas_hidup']):.1f}",
-                                          f"{(k2['index_keamanan'] - k1['index_keamanan']):.1f}",
-                                          f"{(k2['index_kesehatan'] - k1['index_kesehatan']):.1f}",
-                                          f"{(k2['index_pendidikan'] - k1['index_pendidikan']):.1f}"]
-                            }
-                            
-                            st.dataframe(pd.DataFrame(comparison_data), use_container_width=True, hide_index=True)
-                            st.markdown("---")
-                            
-                            col1, col2 = st.columns(2)
-                            with col1:
-                                st.markdown("#### Ringkasan Polusi")
-                                better_pollution = p1['nama_kota'] if p1['index_kualitas_udara'] < p2['index_kualitas_udara'] else p2['nama_kota']
-                                st.success(f"{better_pollution} memiliki kualitas udara lebih baik")
-                            with col2:
-                                st.markdown("#### Ringkasan Kualitas Hidup")
-                                better_quality = k1['nama_kota'] if k1['index_kualitas_hidup'] > k2['index_kualitas_hidup'] else k2['nama_kota']
-                                st.success(f"{better_quality} memiliki kualitas hidup lebih baik")
+                        overview_indicators = [('index_kualitas_udara', 'Index Polusi'), ('pm25', 'PM2.5'),
+                                               ('index_co2', 'CO2'), ('index_kualitas_hidup', 'Index Kualitas Hidup'),
+                                               ('index_keamanan', 'Keamanan'), ('index_kesehatan', 'Kesehatan'),
+                                               ('index_pendidikan', 'Pendidikan')]
+                        comparison_data = {'Indikator': [label for _, label in overview_indicators]}
+                        for nama_kota, row in latest.iterrows():
+                            comparison_data[nama_kota] = [f"{row[col]:.1f}" for col, _ in overview_indicators]
+                        if len(latest) == 2:
+                            first, second = latest.iloc[0], latest.iloc[1]
+                            comparison_data['Selisih'] = [f"{(second[col] - first[col]):.1f}"
+                                                          for col, _ in overview_indicators]
                         else:
-                            st.warning("Tidak ada data lengkap untuk tahun yang sama")
+                            comparison_data['Rentang'] = [f"{(latest[col].max() - latest[col].min()):.1f}"
+                                                          for col, _ in overview_indicators]
+                        
+                        st.dataframe(pd.DataFrame(comparison_data), use_container_width=True, hide_index=True)
+                        st.markdown("---")
+                        
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.markdown("#### Ringkasan Polusi")
+                            better_pollution = latest['index_kualitas_udara'].idxmin()
+                            st.success(f"{better_pollution} memiliki kualitas udara paling baik")
+                        with col2:
+                            st.markdown("#### Ringkasan Kualitas Hidup")
+                            better_quality = latest['index_kualitas_hidup'].idxmax()
+                            st.success(f"{better_quality} memiliki kualitas hidup paling baik")
                     else:
-                        st.warning("Data tidak lengkap untuk overview perbandingan")
+                        st.warning("Tidak ada data lengkap untuk tahun yang sama")
                 except Exception as e:
                     st.error(f"Terjadi error: {str(e)}")
+        
+        render_similar_cities(index, selected_kota[0] if selected_kota else None)
     else:
         st.error("Data kota tidak tersedia")
 
 # Footer
 st.markdown("---")
 st.markdown('<div style="text-align: center; color: gray;"><p>Dashboard Polusi dan Kualitas Hidup | Kelompok 9</p></div>', 
-           unsafe_allow_html=True)
\ No newline at end of file
+           unsafe_allow_html=True)
+
+# Diagnostik
+diagnostics.record('page', menu, (time.perf_counter() - rerun_start) * 1000)
+with st.sidebar:
+    diagnostics.render_panel(st, gauges={'pool': DatabaseConfig.get_pool_stats(),
+                                         'cache': DatabaseConfig.get_cache_stats(),
+                                         'figure_cache': charts.figure_cache.stats()})
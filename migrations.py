@@ -0,0 +1,374 @@
+"""Migrasi skema database bernomor versi
+
+Penggunaan:
+    python migrations.py migrate   # jalankan migrasi yang belum diterapkan
+    python migrations.py status    # tampilkan versi skema
+    python migrations.py explain   # cek rencana query DatabaseConfig (EXPLAIN)
+    python migrations.py refresh   # perbarui tabel turunan (mis. dari cron), --full untuk hitung ulang penuh
+"""
+import argparse
+import sys
+
+from mysql.connector import Error
+
+from config import DatabaseConfig
+
+
+def add_index(table, name, columns, unique=False):
+    """Langkah migrasi untuk menambah index jika belum ada"""
+    return {
+        'check': """
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        """,
+        'params': (table, name),
+        'sql': f"ALTER TABLE {table} ADD {'UNIQUE ' if unique else ''}INDEX {name} ({columns})"
+    }
+
+
+def add_trigger(name, table, event, body):
+    """Langkah migrasi untuk membuat trigger AFTER <event> jika belum ada"""
+    return {
+        'check': """
+            SELECT COUNT(*) FROM information_schema.triggers
+            WHERE trigger_schema = DATABASE() AND trigger_name = %s
+        """,
+        'params': (name,),
+        'sql': f"CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW {body}"
+    }
+
+
+def _summary_delta(sign, row, value_col, total_col, sum_col, count_col):
+    """SET clause untuk menambah/mengurangi satu baris fakta di ringkasan_statistik"""
+    return (f"{total_col} = {total_col} {sign} 1, "
+            f"{sum_col} = {sum_col} {sign} COALESCE({row}.{value_col}, 0), "
+            f"{count_col} = {count_col} {sign} ({row}.{value_col} IS NOT NULL)")
+
+
+def summary_triggers(table, value_col, total_col, sum_col, count_col):
+    """Trigger insert/update/delete yang menjaga ringkasan_statistik untuk satu tabel fakta"""
+    update = "UPDATE ringkasan_statistik SET {} WHERE id = 1"
+    return [
+        add_trigger(f"trg_ringkasan_{table}_ai", table, 'INSERT',
+                    update.format(_summary_delta('+', 'NEW', value_col, total_col, sum_col, count_col))),
+        add_trigger(f"trg_ringkasan_{table}_ad", table, 'DELETE',
+                    update.format(_summary_delta('-', 'OLD', value_col, total_col, sum_col, count_col))),
+        add_trigger(f"trg_ringkasan_{table}_au", table, 'UPDATE',
+                    update.format(f"{sum_col} = {sum_col} + COALESCE(NEW.{value_col}, 0) - COALESCE(OLD.{value_col}, 0), "
+                                  f"{count_col} = {count_col} + (NEW.{value_col} IS NOT NULL) "
+                                  f"- (OLD.{value_col} IS NOT NULL)")),
+    ]
+
+
+def count_triggers(table, total_col):
+    """Trigger insert/delete yang menjaga jumlah baris tabel dimensi di ringkasan_statistik"""
+    update = "UPDATE ringkasan_statistik SET {0} = {0} {1} 1 WHERE id = 1"
+    return [
+        add_trigger(f"trg_ringkasan_{table}_ai", table, 'INSERT', update.format(total_col, '+')),
+        add_trigger(f"trg_ringkasan_{table}_ad", table, 'DELETE', update.format(total_col, '-')),
+    ]
+
+
+def rollup_triggers(table, data_type):
+    """Trigger yang menandai grup (kode_negara, tahun) yang berubah di rollup_dirty"""
+    mark = "SELECT '{0}', kode_negara, {1}.tahun FROM kota WHERE id_kota = {1}.id_kota"
+    insert = "INSERT IGNORE INTO rollup_dirty (tabel, kode_negara, tahun) "
+    return [
+        add_trigger(f"trg_rollup_{table}_ai", table, 'INSERT', insert + mark.format(data_type, 'NEW')),
+        add_trigger(f"trg_rollup_{table}_ad", table, 'DELETE', insert + mark.format(data_type, 'OLD')),
+        add_trigger(f"trg_rollup_{table}_au", table, 'UPDATE',
+                    insert + mark.format(data_type, 'NEW') + " UNION " + mark.format(data_type, 'OLD')),
+    ]
+
+
+def version_triggers(table):
+    """Trigger insert/update/delete yang menaikkan counter versi tabel di versi_tabel"""
+    bump = f"UPDATE versi_tabel SET versi = versi + 1 WHERE tabel = '{table}'"
+    return [add_trigger(f"trg_versi_{table}_{suffix}", table, event, bump)
+            for suffix, event in [('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE')]]
+
+
+def add_auto_increment(table, column):
+    """Langkah migrasi untuk menjadikan primary key INT sebagai AUTO_INCREMENT"""
+    return {
+        'check': """
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+              AND LOCATE('auto_increment', extra) > 0
+        """,
+        'params': (table, column),
+        'sql': f"ALTER TABLE {table} MODIFY {column} INT NOT NULL AUTO_INCREMENT"
+    }
+
+
+def run_sql(sql, check=None, params=None):
+    """Langkah migrasi SQL biasa, dilewati jika query check mengembalikan nilai > 0"""
+    return {'check': check, 'params': params, 'sql': sql}
+
+
+# (versi, deskripsi, langkah) - versi harus naik dan tidak boleh diubah setelah diterapkan
+MIGRATIONS = [
+    (1, 'Unique dan index komposit (id_kota, tahun) / (tahun, id_kota) pada tabel fakta', [
+        add_index('polusi', 'uq_polusi_kota_tahun', 'id_kota, tahun', unique=True),
+        add_index('polusi', 'idx_polusi_tahun_kota', 'tahun, id_kota'),
+        add_index('kualitas_hidup', 'uq_kualitas_kota_tahun', 'id_kota, tahun', unique=True),
+        add_index('kualitas_hidup', 'idx_kualitas_tahun_kota', 'tahun, id_kota'),
+        add_index('populasi_kota', 'uq_populasi_kota_tahun', 'id_kota, tahun', unique=True),
+    ]),
+    (2, 'Index covering untuk daftar negara/kota dan ranking indikator utama', [
+        # Index sekunder InnoDB sudah menyertakan primary key, jadi id_kota/kode_negara ikut ter-cover
+        add_index('kota', 'idx_kota_negara_nama', 'kode_negara, nama_kota'),
+        add_index('kota', 'idx_kota_nama', 'nama_kota'),
+        add_index('negara', 'idx_negara_nama', 'nama_negara, benua'),
+        add_index('negara', 'idx_negara_benua', 'benua, nama_negara'),
+        add_index('polusi', 'idx_polusi_tahun_udara', 'tahun, index_kualitas_udara, id_kota'),
+        add_index('kualitas_hidup', 'idx_kualitas_tahun_hidup', 'tahun, index_kualitas_hidup, id_kota'),
+    ]),
+    (3, 'Tabel ringkasan_statistik untuk halaman Home, dijaga oleh trigger', [
+        run_sql("""
+            CREATE TABLE IF NOT EXISTS ringkasan_statistik (
+                id TINYINT PRIMARY KEY,
+                total_negara INT NOT NULL DEFAULT 0,
+                total_kota INT NOT NULL DEFAULT 0,
+                total_data_polusi INT NOT NULL DEFAULT 0,
+                total_data_kualitas INT NOT NULL DEFAULT 0,
+                sum_polusi DECIMAL(20,2) NOT NULL DEFAULT 0,
+                count_polusi INT NOT NULL DEFAULT 0,
+                sum_kualitas_hidup DECIMAL(20,2) NOT NULL DEFAULT 0,
+                count_kualitas_hidup INT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )
+        """),
+        run_sql(DatabaseConfig.SUMMARY_REFRESH_QUERY),
+        *count_triggers('negara', 'total_negara'),
+        *count_triggers('kota', 'total_kota'),
+        *summary_triggers('polusi', 'index_kualitas_udara', 'total_data_polusi', 'sum_polusi', 'count_polusi'),
+        *summary_triggers('kualitas_hidup', 'index_kualitas_hidup', 'total_data_kualitas',
+                          'sum_kualitas_hidup', 'count_kualitas_hidup'),
+    ]),
+    (4, 'Primary key tabel fakta AUTO_INCREMENT untuk ingest (upsert per id_kota, tahun)', [
+        add_auto_increment('polusi', 'id_polusi'),
+        add_auto_increment('kualitas_hidup', 'id_kualitas_hidup'),
+        add_auto_increment('populasi_kota', 'id_populasi_kota'),
+    ]),
+    (5, 'Rollup statistik indikator per (benua, negara, tahun), grup berubah ditandai trigger', [
+        run_sql("""
+            CREATE TABLE IF NOT EXISTS rollup_indikator (
+                tabel VARCHAR(20) NOT NULL,
+                indikator VARCHAR(40) NOT NULL,
+                benua VARCHAR(100) NOT NULL,
+                kode_negara VARCHAR(3) NOT NULL,
+                tahun INT NOT NULL,
+                jumlah INT NOT NULL,
+                rata_rata DOUBLE,
+                minimum DOUBLE,
+                maksimum DOUBLE,
+                p10 DOUBLE,
+                p25 DOUBLE,
+                p50 DOUBLE,
+                p75 DOUBLE,
+                p90 DOUBLE,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (tabel, indikator, benua, kode_negara, tahun)
+            )
+        """),
+        run_sql("""
+            CREATE TABLE IF NOT EXISTS rollup_dirty (
+                tabel VARCHAR(20) NOT NULL,
+                kode_negara VARCHAR(3) NOT NULL,
+                tahun INT NOT NULL,
+                PRIMARY KEY (tabel, kode_negara, tahun)
+            )
+        """),
+        *rollup_triggers('polusi', 'polusi'),
+        *rollup_triggers('kualitas_hidup', 'kualitas'),
+        # Semua grup yang ada ditandai agar 'python migrations.py refresh' mengisi rollup pertama kali
+        run_sql("""
+            INSERT IGNORE INTO rollup_dirty (tabel, kode_negara, tahun)
+            SELECT DISTINCT 'polusi', k.kode_negara, p.tahun FROM polusi p JOIN kota k ON p.id_kota = k.id_kota
+        """),
+        run_sql("""
+            INSERT IGNORE INTO rollup_dirty (tabel, kode_negara, tahun)
+            SELECT DISTINCT 'kualitas', k.kode_negara, kh.tahun
+            FROM kualitas_hidup kh JOIN kota k ON kh.id_kota = k.id_kota
+        """),
+    ]),
+    (6, 'Counter versi per tabel (versi_tabel) untuk deteksi perubahan termasuk UPDATE, dinaikkan trigger', [
+        run_sql("""
+            CREATE TABLE IF NOT EXISTS versi_tabel (
+                tabel VARCHAR(40) PRIMARY KEY,
+                versi BIGINT NOT NULL DEFAULT 0
+            )
+        """),
+        run_sql(f"INSERT IGNORE INTO versi_tabel (tabel) VALUES "
+                f"{', '.join(f'({t!r})' for t in (*DatabaseConfig.TABLE_PROBES, 'rollup_indikator'))}"),
+        *[trigger for table in DatabaseConfig.TABLE_PROBES for trigger in version_triggers(table)],
+    ]),
+]
+
+SCHEMA_VERSION_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    versi INT PRIMARY KEY,
+    deskripsi VARCHAR(200),
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def get_schema_version(cursor):
+    """Versi skema tertinggi yang sudah diterapkan"""
+    cursor.execute(SCHEMA_VERSION_TABLE)
+    cursor.execute("SELECT COALESCE(MAX(versi), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+
+def migrate(target=None):
+    """Menerapkan semua migrasi yang belum diterapkan, return versi akhir"""
+    with DatabaseConfig.get_pool().connection() as connection:
+        cursor = connection.cursor()
+        current = get_schema_version(cursor)
+        for versi, deskripsi, steps in MIGRATIONS:
+            if versi <= current or (target is not None and versi > target):
+                continue
+            print(f"Migrasi {versi}: {deskripsi}")
+            for step in steps:
+                if step['check']:
+                    cursor.execute(step['check'], step['params'])
+                    if cursor.fetchone()[0]:
+                        continue
+                cursor.execute(step['sql'])
+            cursor.execute("INSERT INTO schema_version (versi, deskripsi) VALUES (%s, %s)",
+                           (versi, deskripsi))
+            connection.commit()
+            current = versi
+        cursor.close()
+    DatabaseConfig.invalidate_cache()
+    return current
+
+
+def status():
+    """Menampilkan migrasi yang sudah dan belum diterapkan"""
+    with DatabaseConfig.get_pool().connection() as connection:
+        cursor = connection.cursor()
+        current = get_schema_version(cursor)
+        cursor.close()
+    for versi, deskripsi, _ in MIGRATIONS:
+        print(f"[{'x' if versi <= current else ' '}] {versi}: {deskripsi}")
+    return current
+
+
+def _sample_keys():
+    """Mengambil contoh kode_negara dan id_kota untuk pengecekan rencana query"""
+    with DatabaseConfig.get_pool().connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT kode_negara, id_kota FROM kota ORDER BY id_kota LIMIT 1")
+        row = cursor.fetchone()
+        cursor.close()
+    return row if row else ('USA', 1)
+
+
+def plan_checks():
+    """Daftar (nama, pemanggilan DatabaseConfig, alias tabel yang boleh full scan)
+
+    Query tanpa filter memang harus membaca seluruh tabel, jadi tabel tersebut
+    dikecualikan secara eksplisit. Selain itu semua akses harus lewat index.
+    """
+    kode_negara, id_kota = _sample_keys()
+    return [
+        ('get_negara_list', lambda: DatabaseConfig.get_negara_list(), {'negara'}),
+        ('get_kota_by_negara', lambda: DatabaseConfig.get_kota_by_negara(kode_negara), set()),
+        ('get_all_kota', lambda: DatabaseConfig.get_all_kota(), {'k', 'n'}),
+        ('get_polusi_data(id_kota)', lambda: DatabaseConfig.get_polusi_data(id_kota=id_kota), set()),
+        ('get_polusi_data(kode_negara)', lambda: DatabaseConfig.get_polusi_data(kode_negara=kode_negara), set()),
+        ('get_polusi_data(tahun)', lambda: DatabaseConfig.get_polusi_data(tahun=2020), {'k', 'n'}),
+        ('get_kualitas_hidup_data(id_kota)', lambda: DatabaseConfig.get_kualitas_hidup_data(id_kota=id_kota), set()),
+        ('get_kualitas_hidup_data(kode_negara)',
+         lambda: DatabaseConfig.get_kualitas_hidup_data(kode_negara=kode_negara), set()),
+        ('get_populasi_kota(id_kota)', lambda: DatabaseConfig.get_populasi_kota(id_kota=id_kota), set()),
+        ('get_summary_stats', lambda: DatabaseConfig.get_summary_stats(), set()),
+        ('get_latest_snapshot', lambda: DatabaseConfig.get_latest_snapshot('polusi'), {'k', 'n'}),
+        ('get_top_n(polusi)', lambda: DatabaseConfig.get_top_n('polusi', 'index_kualitas_udara'), set()),
+        ('get_comparison_data', lambda: DatabaseConfig.get_comparison_data([id_kota, id_kota + 1]), set()),
+        ('get_fact_page', lambda: DatabaseConfig.get_fact_page('polusi', ['nama_kota', 'pm25'], after=(2100, 0)),
+         {'k', 'n'}),
+        ('get_fact_page(kode_negara)',
+         lambda: DatabaseConfig.get_fact_page('polusi', ['nama_kota', 'pm25'], kode_negara=kode_negara), set()),
+        ('count_fact_rows(kode_negara)', lambda: DatabaseConfig.count_fact_rows('polusi', kode_negara=kode_negara),
+         set()),
+        ('get_top_n(kualitas)', lambda: DatabaseConfig.get_top_n('kualitas', 'index_kualitas_hidup'), set()),
+        ('get_tahun_list', lambda: DatabaseConfig.get_tahun_list(), set()),
+        ('get_rollup(benua)', lambda: DatabaseConfig.get_rollup('polusi', 'index_kualitas_udara'), set()),
+        ('get_drilldown(negara)',
+         lambda: DatabaseConfig.get_drilldown('polusi', 'pm25', kode_negara=kode_negara), set()),
+    ]
+
+
+def capture_queries(func):
+    """Menjalankan func dan mengembalikan query yang dikirim ke execute_query"""
+    captured = []
+    original = DatabaseConfig.__dict__['execute_query']
+
+    def recorder(query, params=None, **kwargs):
+        captured.append((query, params))
+        return original.__func__(query, params=params, use_cache=False)
+
+    DatabaseConfig.execute_query = staticmethod(recorder)
+    try:
+        func()
+    finally:
+        DatabaseConfig.execute_query = original
+    return captured
+
+
+def check_query_plans(verbose=True):
+    """EXPLAIN setiap query DatabaseConfig, return daftar query yang full scan"""
+    failures = []
+    with DatabaseConfig.get_pool().connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        for name, func, allowed in plan_checks():
+            for query, params in capture_queries(func):
+                cursor.execute("EXPLAIN " + query, params)
+                for row in cursor.fetchall():
+                    table = row.get('table')
+                    if row.get('type') == 'ALL' and table not in allowed:
+                        failures.append((name, table, row.get('rows')))
+                        if verbose:
+                            print(f"FULL SCAN {name}: tabel {table} ({row.get('rows')} baris)")
+        cursor.close()
+    if verbose and not failures:
+        print("Semua query DatabaseConfig memakai index")
+    return failures
+
+
+def refresh(full=False):
+    """Menghitung ulang semua tabel turunan dari tabel sumber"""
+    DatabaseConfig.refresh_summary_stats()
+    print("Tabel ringkasan_statistik diperbarui")
+    rows = DatabaseConfig.refresh_rollup(full)
+    print(f"Tabel rollup_indikator diperbarui ({rows} baris{', penuh' if full else ''})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrasi skema database polusi")
+    parser.add_argument('command', choices=['migrate', 'status', 'explain', 'refresh'])
+    parser.add_argument('--target', type=int, default=None, help="versi migrasi tujuan")
+    parser.add_argument('--full', action='store_true', help="refresh: hitung ulang seluruh rollup")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'migrate':
+            print(f"Versi skema: {migrate(args.target)}")
+        elif args.command == 'status':
+            print(f"Versi skema: {status()}")
+        elif args.command == 'refresh':
+            refresh(args.full)
+        else:
+            return 1 if check_query_plans() else 0
+    except Error as e:
+        print(f"Error migrasi: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Pencarian kota serupa berdasarkan vektor indikator polusi dan kualitas hidup
+
+Untuk satu tahun, setiap kota direpresentasikan sebagai vektor indikator yang
+dinormalisasi (z-score per indikator). Index berupa matriks float32 beserta
+norma kuadratnya, dibangun sekali per (versi data, tahun), sehingga satu query
+K tetangga terdekat hanya satu perkalian matriks-vektor (milidetik untuk 100k kota).
+Tetangga untuk semua kota sekaligus dihitung per blok, paralel di process pool
+jika jumlah kota besar.
+
+Penggunaan:
+    python similarity.py --kota 1 --tahun 2024 -k 10
+    python similarity.py --semua --tahun 2024 -k 10 --output tetangga_2024.csv
+"""
+import argparse
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from config import DatabaseConfig
+
+POLUSI_FEATURES = DatabaseConfig.FACT_TABLES['polusi']['columns'][3:]
+KUALITAS_FEATURES = DatabaseConfig.FACT_TABLES['kualitas']['columns'][3:]
+FEATURES = POLUSI_FEATURES + KUALITAS_FEATURES
+# Mulai jumlah kota ini, tetangga semua kota dihitung di process pool
+PROCESS_POOL_MIN_KOTA = 20000
+# Baris per blok matriks jarak (256 x 100k float32 = 100 MB)
+BLOCK_SIZE = 256
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _range_neighbours(matrix, norms, start, stop, k):
+    """K tetangga terdekat untuk baris start:stop, per blok (fungsi top-level agar bisa di-pickle)"""
+    nearest_parts, distance_parts = [], []
+    for block_start in range(start, stop, BLOCK_SIZE):
+        block_stop = min(block_start + BLOCK_SIZE, stop)
+        # ||a - b||^2 = ||a||^2 + ||b||^2 - 2ab
+        block = matrix[block_start:block_stop]
+        distances = norms[block_start:block_stop, None] + norms[None, :] - 2 * block @ matrix.T
+        distances[np.arange(block_stop - block_start), np.arange(block_start, block_stop)] = np.inf
+        nearest = np.argpartition(distances, k, axis=1)[:, :k]
+        nearest_dist = np.take_along_axis(distances, nearest, axis=1)
+        order = np.argsort(nearest_dist, axis=1)
+        nearest_parts.append(np.take_along_axis(nearest, order, axis=1))
+        distance_parts.append(np.sqrt(np.maximum(np.take_along_axis(nearest_dist, order, axis=1), 0)))
+    return np.vstack(nearest_parts), np.vstack(distance_parts)
+
+
+class SimilarityIndex:
+    """Matriks indikator ternormalisasi untuk satu tahun"""
+
+    def __init__(self, data, tahun, version=None):
+        self.tahun = tahun
+        self.version = version
+        data = data.dropna(subset=FEATURES).reset_index(drop=True)
+        values = data[FEATURES].to_numpy(dtype=np.float64)
+        self.mean = values.mean(axis=0) if len(values) else np.zeros(len(FEATURES))
+        std = values.std(axis=0) if len(values) else np.ones(len(FEATURES))
+        self.std = np.where(std > 0, std, 1.0)
+        self.matrix = ((values - self.mean) / self.std).astype(np.float32)
+        self.norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        self.ids = data['id_kota'].to_numpy()
+        self.position = {int(id_kota): i for i, id_kota in enumerate(self.ids)}
+        self.info = data[['id_kota', 'nama_kota', 'nama_negara'] + FEATURES]
+
+    @classmethod
+    def load(cls, tahun, version=None):
+        """Membangun index dari data polusi dan kualitas hidup satu tahun"""
+        keys = ['id_kota', 'nama_kota', 'nama_negara']
+        polusi = DatabaseConfig.get_polusi_data(tahun=tahun, columns=keys + POLUSI_FEATURES)
+        kualitas = DatabaseConfig.get_kualitas_hidup_data(tahun=tahun, columns=['id_kota'] + KUALITAS_FEATURES)
+        if polusi.empty or kualitas.empty:
+            return cls(pd.DataFrame(columns=keys + FEATURES), tahun, version)
+        return cls(polusi.merge(kualitas, on='id_kota'), tahun, version)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query(self, id_kota, k=10):
+        """K kota paling mirip dengan id_kota (tanpa kota itu sendiri), urut jarak menaik"""
+        i = self.position.get(int(id_kota))
+        if i is None:
+            return self.info.iloc[0:0].assign(jarak=[])
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return self.info.iloc[0:0].assign(jarak=[])
+        distances = self.norms + self.norms[i] - 2 * (self.matrix @ self.matrix[i])
+        distances[i] = np.inf
+        nearest = np.argpartition(distances, k)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        result = self.info.iloc[nearest].copy()
+        result.insert(3, 'jarak', np.sqrt(np.maximum(distances[nearest], 0)))
+        return result.reset_index(drop=True)
+
+    def all_neighbours(self, k=10, workers=None):
+        """Tetangga terdekat semua kota: (id_kota x k) id tetangga dan jaraknya
+
+        Dihitung per blok BLOCK_SIZE baris; di atas PROCESS_POOL_MIN_KOTA kota baris
+        dibagi menjadi beberapa rentang yang dihitung paralel di process pool.
+        """
+        k = min(k, len(self) - 1)
+        if k <= 0:
+            return np.empty((len(self), 0), dtype=self.ids.dtype), np.empty((len(self), 0), dtype=np.float32)
+        workers = workers or os.cpu_count() or 1
+        if len(self) >= PROCESS_POOL_MIN_KOTA and workers > 1:
+            # Beberapa rentang per worker agar beban seimbang; matriks dikirim sekali per rentang
+            step = -(-len(self) // (workers * 4))
+            ranges = [(start, min(start + step, len(self))) for start in range(0, len(self), step)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_range_neighbours, self.matrix, self.norms, start, stop, k)
+                           for start, stop in ranges]
+                parts = [future.result() for future in futures]
+            nearest = np.vstack([p[0] for p in parts])
+            distances = np.vstack([p[1] for p in parts])
+        else:
+            nearest, distances = _range_neighbours(self.matrix, self.norms, 0, len(self), k)
+        return self.ids[nearest], distances
+
+
+def get_index(tahun):
+    """Index bersama untuk (versi data, tahun), dibangun sekali"""
+    version = DatabaseConfig.get_data_version('negara', 'kota', 'polusi', 'kualitas_hidup')
+    key = (version, int(tahun))
+    index = _indexes.get(key)
+    if index is not None:
+        return index
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            # Index versi lama dibuang
+            for old_key in [k for k in _indexes if k[0] != version]:
+                del _indexes[old_key]
+            index = SimilarityIndex.load(int(tahun), version)
+            # Query gagal/kosong: jangan disimpan agar dicoba lagi pada pemanggilan berikutnya
+            if len(index):
+                _indexes[key] = index
+        return index
+
+
+def find_similar(id_kota, tahun, k=10):
+    """K kota paling mirip dengan id_kota pada tahun tertentu"""
+    return get_index(tahun).query(id_kota, k)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cari kota serupa berdasarkan indikator polusi & kualitas hidup")
+    parser.add_argument('--tahun', type=int, required=True)
+    parser.add_argument('-k', type=int, default=10)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--kota', type=int, help="id_kota yang dicari kota serupanya")
+    group.add_argument('--semua', action='store_true', help="hitung tetangga untuk semua kota")
+    parser.add_argument('--workers', type=int, default=None, help="jumlah proses untuk --semua")
+    parser.add_argument('--output', default=None, help="file CSV hasil --semua")
+    parser.add_argument('--snapshot', default=None, help="jalankan terhadap direktori snapshot, bukan MySQL")
+    args = parser.parse_args(argv)
+
+    if args.snapshot:
+        DatabaseConfig.READ_BACKEND = 'snapshot'
+        DatabaseConfig.SNAPSHOT_DIR = args.snapshot
+
+    index = get_index(args.tahun)
+    if args.kota is not None:
+        print(index.query(args.kota, args.k).to_string(index=False))
+        return 0
+
+    neighbours, distances = index.all_neighbours(args.k, args.workers)
+    result = pd.DataFrame({
+        'id_kota': np.repeat(index.ids, neighbours.shape[1]),
+        'peringkat': np.tile(np.arange(1, neighbours.shape[1] + 1), len(index)),
+        'id_kota_serupa': neighbours.ravel(),
+        'jarak': distances.ravel()
+    })
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"{len(result)} baris ditulis ke {args.output}")
+    else:
+        print(result.to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""Snapshot kolumnar lokal dari tabel database
+
+Tabel diekspor ke file Arrow IPC (di-memory-map saat dibaca) atau Parquet,
+lalu di-query dengan DuckDB memakai SQL yang sama dengan DatabaseConfig.
+Aktifkan dengan POLUSI_READ_BACKEND=snapshot.
+
+Penggunaan:
+    python snapshot.py export [--dir snapshot] [--format arrow|parquet]
+    python snapshot.py refresh [--dir snapshot]   # export hanya jika versi data berubah
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+from config import DatabaseConfig
+
+SNAPSHOT_TABLES = ('negara', 'kota', 'populasi_kota', 'polusi', 'kualitas_hidup')
+MANIFEST_FILE = 'manifest.json'
+
+# Tabel turunan dibuat sebagai view di atas snapshot, bukan diekspor
+SNAPSHOT_VIEWS = {
+    'ringkasan_statistik': """
+        SELECT 1 AS id,
+            (SELECT COUNT(*) FROM negara) AS total_negara,
+            (SELECT COUNT(*) FROM kota) AS total_kota,
+            (SELECT COUNT(*) FROM polusi) AS total_data_polusi,
+            (SELECT COUNT(*) FROM kualitas_hidup) AS total_data_kualitas,
+            (SELECT COALESCE(SUM(index_kualitas_udara), 0) FROM polusi) AS sum_polusi,
+            (SELECT COUNT(index_kualitas_udara) FROM polusi) AS count_polusi,
+            (SELECT COALESCE(SUM(index_kualitas_hidup), 0) FROM kualitas_hidup) AS sum_kualitas_hidup,
+            (SELECT COUNT(index_kualitas_hidup) FROM kualitas_hidup) AS count_kualitas_hidup
+    """
+}
+
+
+def _rollup_query():
+    """rollup_indikator dihitung oleh DuckDB dari tabel fakta snapshot"""
+    parts = []
+    for data_type in DatabaseConfig.ROLLUP_TYPES:
+        fact = DatabaseConfig.FACT_TABLES[data_type]
+        parts.append(f"""
+            SELECT '{data_type}' AS tabel, u.indikator, n.benua, k.kode_negara, u.tahun, u.nilai
+            FROM (UNPIVOT {fact['table']} ON {', '.join(fact['columns'][3:])} INTO NAME indikator VALUE nilai) u
+            JOIN kota k ON u.id_kota = k.id_kota
+            JOIN negara n ON k.kode_negara = n.kode_negara""")
+    quantiles = ", ".join(f"quantile_cont(nilai, {q}) AS {name}"
+                          for name, q in DatabaseConfig.ROLLUP_QUANTILES.items())
+    return f"""
+        SELECT tabel, indikator, benua, COALESCE(kode_negara, '') AS kode_negara, tahun,
+            COUNT(nilai) AS jumlah, AVG(nilai) AS rata_rata, MIN(nilai) AS minimum, MAX(nilai) AS maksimum,
+            {quantiles}
+        FROM ({' UNION ALL '.join(parts)}) v
+        GROUP BY GROUPING SETS ((tabel, indikator, benua, kode_negara, tahun), (tabel, indikator, benua, tahun))
+    """
+
+
+# Tabel turunan yang dihitung sekali saat snapshot dimuat (terlalu mahal sebagai view)
+SNAPSHOT_MATERIALIZED = {'rollup_indikator': _rollup_query()}
+
+
+def _require(module):
+    """Import dependency opsional snapshot dengan pesan error yang jelas"""
+    try:
+        return __import__(module)
+    except ImportError as e:
+        raise ImportError(f"Snapshot membutuhkan paket '{module}' (pip install {module})") from e
+
+
+def read_manifest(directory):
+    """Membaca manifest snapshot, None jika belum ada"""
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_snapshot(directory, frames, version, fmt='arrow'):
+    """Menulis DataFrame per tabel ke file snapshot dan mengganti manifest secara atomik"""
+    pa = _require('pyarrow')
+    os.makedirs(directory, exist_ok=True)
+    old_manifest = read_manifest(directory)
+
+    # Nama file unik per ekspor: file lama yang sedang di-memory-map tidak pernah ditimpa
+    suffix = f"{version}.{int(time.time() * 1000)}"
+    tables = {}
+    for table, df in frames.items():
+        file_name = f"{table}.{suffix}.{fmt}"
+        path = os.path.join(directory, file_name)
+        arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(arrow_table, path)
+        else:
+            # Arrow IPC tanpa kompresi agar bisa di-memory-map tanpa decode
+            with pa.OSFile(path, 'wb') as sink:
+                with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                    writer.write_table(arrow_table)
+        tables[table] = {'file': file_name, 'rows': arrow_table.num_rows}
+
+    manifest = {'version': version, 'format': fmt, 'created_at': time.time(), 'tables': tables}
+    tmp_path = os.path.join(directory, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+
+    # File snapshot lama aman dihapus walau masih di-memory-map (Linux/macOS)
+    if old_manifest:
+        for info in old_manifest['tables'].values():
+            if info['file'] not in {t['file'] for t in tables.values()}:
+                try:
+                    os.remove(os.path.join(directory, info['file']))
+                except OSError:
+                    pass
+    return manifest
+
+
+def export_snapshot(directory=None, fmt='arrow'):
+    """Mengekspor semua tabel dari MySQL ke snapshot lokal"""
+    directory = directory or DatabaseConfig.SNAPSHOT_DIR
+    version = DatabaseConfig.get_data_version(*SNAPSHOT_TABLES)
+    frames = {}
+    with DatabaseConfig.get_pool().connection() as connection:
+        for table in SNAPSHOT_TABLES:
+            frames[table] = DatabaseConfig.fetch_frame(connection, f"SELECT * FROM {table}", compact=False)
+    return write_snapshot(directory, frames, version, fmt)
+
+
+def refresh_snapshot(directory=None, fmt='arrow'):
+    """Mengekspor ulang snapshot hanya jika versi data di MySQL berubah, return True jika diekspor"""
+    directory = directory or DatabaseConfig.SNAPSHOT_DIR
+    manifest = read_manifest(directory)
+    DatabaseConfig.refresh_table_versions(force=True)
+    if manifest and manifest['version'] == DatabaseConfig.get_data_version(*SNAPSHOT_TABLES):
+        return False
+    export_snapshot(directory, fmt)
+    return True
+
+
+class SnapshotEngine:
+    """Mesin query kolumnar (DuckDB) di atas file snapshot"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.version = None
+        self._manifest_mtime = None
+        self._con = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self.check_interval = 2.0
+
+    def _load(self):
+        """Memuat (ulang) file snapshot ke koneksi DuckDB baru"""
+        duckdb = _require('duckdb')
+        manifest = read_manifest(self.directory)
+        if manifest is None:
+            raise FileNotFoundError(f"Snapshot belum ada di {self.directory}, jalankan 'python snapshot.py export'")
+
+        con = duckdb.connect(database=':memory:')
+        for table, info in manifest['tables'].items():
+            path = os.path.join(self.directory, info['file'])
+            if manifest['format'] == 'parquet':
+                con.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{path}')")
+            else:
+                pa = _require('pyarrow')
+                arrow_table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+                con.register(table, arrow_table)
+        for view, sql in SNAPSHOT_VIEWS.items():
+            con.execute(f"CREATE VIEW {view} AS {sql}")
+        for table, sql in SNAPSHOT_MATERIALIZED.items():
+            con.execute(f"CREATE TABLE {table} AS {sql}")
+
+        old_con, self._con = self._con, con
+        self.version = manifest['version']
+        self._manifest_mtime = os.path.getmtime(os.path.join(self.directory, MANIFEST_FILE))
+        if old_con is not None:
+            old_con.close()
+
+    def _ensure_loaded(self):
+        """Memuat snapshot saat pertama dipakai atau saat manifest berganti"""
+        now = time.monotonic()
+        if self._con is not None and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        if self._con is None or (os.path.exists(path) and os.path.getmtime(path) != self._manifest_mtime):
+            self._load()
+
+    def query(self, query, params=None):
+        """Eksekusi query SQL DatabaseConfig (placeholder %s) dan return DataFrame"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._con.execute(query.replace('%s', '?'), list(params or [])).df()
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(directory):
+    """Mesin snapshot bersama per direktori"""
+    with _engines_lock:
+        engine = _engines.get(directory)
+        if engine is None:
+            engine = _engines[directory] = SnapshotEngine(directory)
+    with engine._lock:
+        engine._ensure_loaded()
+    return engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot kolumnar lokal database polusi")
+    parser.add_argument('command', choices=['export', 'refresh'])
+    parser.add_argument('--dir', default=None, help="direktori snapshot")
+    parser.add_argument('--format', choices=['arrow', 'parquet'], default='arrow')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.command == 'export':
+        manifest = export_snapshot(args.dir, args.format)
+    else:
+        if not refresh_snapshot(args.dir, args.format):
+            print("Snapshot sudah up to date")
+            return 0
+        manifest = read_manifest(args.dir or DatabaseConfig.SNAPSHOT_DIR)
+    rows = sum(t['rows'] for t in manifest['tables'].values())
+    print(f"Snapshot {manifest['version']}: {rows} baris dalam {time.perf_counter() - start:.2f} detik")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
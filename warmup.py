@@ -0,0 +1,136 @@
+"""Pre-warm cache dashboard saat server start, sebelum request pertama
+
+Streamlit tidak punya hook server start dan main.py baru dijalankan saat sesi
+pertama dibuka, sehingga pre-warm dari dalam main.py tetap dibayar pengunjung
+pertama. Launcher ini mengisi cache dimensi negara/kota dan agregat Home di
+thread latar lalu menjalankan server Streamlit di proses yang sama; main.py
+memakai modul config/dimensions yang sama (sys.modules), jadi cache yang sudah
+terisi langsung dipakai.
+
+Jika POLUSI_STATS_PORT diisi, launcher juga membuka endpoint GET /stats?since=<ts>
+(JSON: statistik pool, cache, memori dan ringkasan event diagnostik proses
+server) untuk loadtest.py; POLUSI_MAX_EVENTS mengubah kapasitas ring buffer
+diagnostik.
+
+Penggunaan:
+    python warmup.py
+    python warmup.py --server.port 8501 --server.headless true
+    POLUSI_STATS_PORT=8503 python warmup.py --server.port 8501
+"""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import charts
+import diagnostics
+import dimensions
+from config import DatabaseConfig
+
+# Query halaman Home, juga dipakai untuk pre-warm cache
+HOME_QUERIES = {
+    'stats': DatabaseConfig.get_summary_stats,
+    'polusi': (DatabaseConfig.get_top_n, 'polusi', 'index_kualitas_udara', 5),
+    'kualitas': (DatabaseConfig.get_top_n, 'kualitas', 'index_kualitas_hidup', 5),
+    'dimensi': dimensions.get_index
+}
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def prewarm():
+    """Mengisi cache dimensi negara/kota dan agregat Home, return dict nama -> hasil"""
+    with diagnostics.timer('startup', 'prewarm') as info:
+        results = DatabaseConfig.run_queries(HOME_QUERIES)
+        info['rows'] = sum(len(result) for result in results.values())
+    return results
+
+
+def start():
+    """Menjalankan prewarm di thread latar, sekali per proses; return thread tersebut"""
+    global _thread
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=prewarm, name='prewarm', daemon=True)
+            _thread.start()
+        return _thread
+
+
+def server_stats(since=None):
+    """Statistik proses server: gauges pool/cache/memori dan ringkasan event sejak since (epoch detik)"""
+    all_events = diagnostics.events()
+    events = [e for e in all_events if since is None or e['ts'] >= since]
+    queries = [e for e in events if e['kind'] == 'query']
+    db_queries = [e for e in queries if not e.get('cache_hit')]
+    return {
+        'ts': time.time(),
+        'pool': DatabaseConfig.get_pool_stats(),
+        'cache': DatabaseConfig.get_cache_stats(),
+        'figure_cache': charts.figure_cache.stats(),
+        'rss_mb': round(diagnostics.rss_mb(), 1),
+        'db_queries': len(db_queries),
+        'cache_hits': len(queries) - len(db_queries),
+        'query_ms': round(sum(e['wall_ms'] for e in db_queries), 3),
+        'render_ms': round(sum(e['wall_ms'] for e in events if e['kind'] == 'render'), 3),
+        'pages': sum(1 for e in events if e['kind'] == 'page'),
+        # Ring buffer penuh dan event tertua lebih baru dari since: sebagian event sudah tergeser
+        'events_truncated': bool(since is not None and len(all_events) >= diagnostics.MAX_EVENTS
+                                 and all_events[0]['ts'] > since)
+    }
+
+
+class StatsHandler(BaseHTTPRequestHandler):
+    """GET /stats?since=<ts> -> server_stats sebagai JSON"""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != '/stats':
+            self.send_error(404)
+            return
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            since = float(query['since']) if 'since' in query else None
+        except ValueError:
+            self.send_error(400, "since harus epoch detik")
+            return
+        body = json.dumps(server_stats(since), default=str).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stats_server(port, host='127.0.0.1'):
+    """Menjalankan endpoint /stats di thread latar, return server-nya"""
+    server = ThreadingHTTPServer((host, port), StatsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='stats', daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    """Mulai pre-warm lalu jalankan `streamlit run main.py` dengan argumen tambahan"""
+    from streamlit.web import cli
+
+    if os.environ.get('POLUSI_MAX_EVENTS'):
+        diagnostics.set_max_events(int(os.environ['POLUSI_MAX_EVENTS']))
+    if os.environ.get('POLUSI_STATS_PORT'):
+        start_stats_server(int(os.environ['POLUSI_STATS_PORT']))
+    start()
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    sys.argv = ['streamlit', 'run', script, *(sys.argv[1:] if argv is None else argv)]
+    return cli.main()
+
+
+if __name__ == '__main__':
+    # Lewat modul `warmup` agar main.py melihat thread pre-warm yang sama, bukan salinan __main__
+    import warmup
+    sys.exit(warmup.main())